@@ -4,12 +4,17 @@ import requests
 
 
 class KineticClient:
+    # How many content items are requested at a time when a frame is read in pages.
+    DEFAULT_PAGE_SIZE = 1000
+
     def __init__(self, host: str, session: requests.Session = None):
         if session is None:
             self.session = requests.Session()
         else:
             self.session = session
         self.host = host
+        # path -> (etag, result) of responses the server can revalidate
+        self._etag_cache = {}
 
     #
     # Abstractions over http requests
@@ -28,6 +33,20 @@ class KineticClient:
             self.session.get(url=self.host + path, params=params, **kwargs)
         )
 
+    def _get_json_cached(self, path, params=None, **kwargs):
+        """Like _get_json, but sends the etag of the last response so the server can answer with a 304 if nothing changed."""
+        headers = kwargs.pop("headers", {})
+        cached = self._etag_cache.get(path)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        resp = self.session.get(url=self.host + path, params=params, headers=headers, **kwargs)
+        if cached and resp.status_code == 304:
+            return cached[1]
+        result = self.__process_response__(resp)
+        if "ETag" in resp.headers:
+            self._etag_cache[path] = (resp.headers["ETag"], result)
+        return result
+
     def _put(self, path, data=None, **kwargs):
         return self.__process_response__(
             self.session.put(url=self.host + path, data=data, **kwargs)
@@ -46,7 +65,45 @@ class KineticClient:
         Returns:
             dict: An object containing the frame settings and content.
         """
-        return self._get_json(f"/frame/{id}")
+        return self._get_json_cached(f"/frame/{id}")
+
+    def frame_paged(self, id: str, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+        """Gets all of the frame info for the frame with the provided id, reading its content a page at a time
+        so that neither the server nor the frame has to hold a large frame's response in memory at once.
+
+        Args:
+            id (str): The id of the frame to get.
+            page_size (int): How many content items to request at a time.
+
+        Returns:
+            dict: An object containing the frame settings and content, like `frame` returns.
+        """
+        page = self._get_json(f"/frame/{id}", params={"page_size": page_size})
+        # The first page carries the settings, pre-render and change log position.
+        frame = {
+            "frame": page["frame"],
+            "content": page["content"],
+            "pre_render": page["pre_render"],
+            "seq": page.get("seq"),
+        }
+        while page.get("next_cursor"):
+            page = self._get_json(
+                f"/frame/{id}", params={"page_size": page_size, "cursor": page["next_cursor"]}
+            )
+            frame["content"] += page["content"]
+        return frame
+
+    def frame_changes(self, id: str, since: int) -> dict:
+        """Gets the content that entered or left the frame since a point in the server's change log.
+
+        Args:
+            id (str): The id of the frame to get.
+            since (int): The "seq" of the last frame info or changes that were fetched.
+
+        Returns:
+            dict: An object containing the frame settings, the latest "seq", and the "added" content and "removed" content ids.
+        """
+        return self._get_json(f"/frame/{id}/changes", params={"since": since})
 
     def video(self, id: str) -> bytes:
         """Retrieves the video from the kinetic server.
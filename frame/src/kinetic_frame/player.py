@@ -3,7 +3,7 @@ import logging
 import logging.config
 import os
 from subprocess import PIPE, STDOUT, Popen
-from typing import List
+from typing import List, Optional
 
 from .config import DEFAULT_CONFIG_PATH, _load
 from .photo_storage import *
@@ -32,6 +32,58 @@ def reset_playlist(frame: dict, client: KineticClient, storage_directory: str, p
     create_playlist(playlist_file, object_ids, storage_directory)
     delete_old_files(object_ids, storage_directory)
 
+def apply_changes(frame: dict, changes: dict) -> dict:
+    """Applies the result of a /frame/{id}/changes call to a previously fetched frame.
+
+    Args:
+        frame (dict): The frame info the changes were requested for.
+        changes (dict): The changes returned by the server.
+
+    Returns:
+        dict: The updated frame info.
+    """
+    content = {c["id"]: c for c in frame["content"]}
+    for id in changes["removed"]:
+        content.pop(id, None)
+    for c in changes["added"]:
+        content[c["id"]] = c
+    return {
+        "frame": changes["frame"],
+        # Ordered like the server orders frames, newest first with ties broken by id, so it matches a full fetch.
+        "content": sorted(content.values(), key=lambda c: (c["created_at"], c["id"]), reverse=True),
+        "pre_render": changes["pre_render"],
+        "seq": changes["seq"],
+    }
+
+def get_frame(client: KineticClient, frame_id: str, previous_frame: Optional[dict]) -> dict:
+    """Gets the frame's info. If the server keeps a change log, only the changes since previous_frame are downloaded.
+    Otherwise the full frame is read a page at a time.
+
+    Args:
+        client (KineticClient): The kinetic photos client
+        frame_id (str): The frame to get
+        previous_frame (Optional[dict]): The last frame info that was fetched, if any.
+
+    Returns:
+        dict: The frame's info
+    """
+    if previous_frame and previous_frame.get("seq") is not None:
+        try:
+            changes = client.frame_changes(frame_id, previous_frame["seq"])
+            # New query parameters change which content is in the frame, so they need a full download.
+            if changes["frame"] == previous_frame["frame"]:
+                return apply_changes(previous_frame, changes)
+        except Exception as e:
+            logging.warning(f"Could not get changes for frame {frame_id}, fetching the full frame...", exc_info=e)
+    return client.frame_paged(frame_id)
+
+def frame_changed(frame: dict, previous_frame: Optional[dict]) -> bool:
+    """Compares two frame infos, ignoring their position in the server's change log."""
+    if previous_frame is None:
+        return True
+    ignore_seq = lambda f: {k: v for k, v in f.items() if k != "seq"}
+    return ignore_seq(frame) != ignore_seq(previous_frame)
+
 def stop_subprocess(sub):
     sub.terminate()
     sub.wait()
@@ -77,7 +129,7 @@ def main():
     while True:
         logging.info(f"trying to get frame.. {frame_id}")
         try:
-            frame = client.frame(frame_id)
+            frame = get_frame(client, frame_id, previous_frame)
         except Exception as e:
             if os.path.exists(playlist_file):
                 logging.warning(f"Could not get frame id {frame_id}, proceeding with cached version of {playlist_file}...", exc_info=e)
@@ -86,12 +138,13 @@ def main():
             else:
                 logging.error(f"Could not get frame id {frame_id}, trying again after {config['poll_interval']}ms...", exc_info=e)
 
-        if frame and frame != previous_frame:
-            previous_frame = frame
-            reset_playlist(previous_frame, client, storage_directory, playlist_file)
+        if frame and frame_changed(frame, previous_frame):
+            reset_playlist(frame, client, storage_directory, playlist_file)
             if subprocess_pid:
                 stop_subprocess(subprocess_pid)
             subprocess_pid = start_player(config["player_cmd"], playlist_file)
+        if frame:
+            previous_frame = frame
         try:
             time.sleep(config['poll_interval'])
         except KeyboardInterrupt as e:
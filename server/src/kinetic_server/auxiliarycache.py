@@ -33,5 +33,19 @@ class AuxiliaryCache:
             auxiliary_data (bytes): The data to save
         """
         hash = self.os.add(auxiliary_data)
+        return self._save_hash(id, type, hash)
+
+    def save_file(self, id: str, type: str, filename: str) -> AuxiliaryData:
+        """Saves some new data to the cache by streaming it from a file on disk.
+
+        Args:
+            id (str): The identifier of the stream media this data is for.
+            type (str): The type of data being saved.
+            filename (str): The file containing the data to save
+        """
+        hash = self.os.add_file(filename)
+        return self._save_hash(id, type, hash)
+
+    def _save_hash(self, id: str, type: str, hash: str) -> AuxiliaryData:
         self.db.save(AuxiliaryData(id=id, type=type, computed_at=datetime.now(), file_hash=hash))
         return self.db.get(id, type)
@@ -0,0 +1,242 @@
+"""
+Measures the server's hot paths against a temporary database seeded like the one `query_plans` checks.
+
+Each benchmark runs the same work the old way and the current way so that the two can be compared on the same machine.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+from .db import ConnectionPool, ContentDb, FramesDb, PreRenderDb
+from .frames import FramesApi
+from .io_pool import AsyncAdapter, IoPool
+from .query_plans import seed
+
+
+@dataclass
+class FilterResult:
+    name: str
+    items: int
+    total_ms: float
+    per_item_us: float
+    memory_bytes: int  # Memory held by the filter once it has run
+
+
+@dataclass
+class ReadResult:
+    name: str
+    rows: int
+    total_ms: float
+    allocated_bytes: int  # The peak memory allocated while reading
+
+
+@dataclass
+class LatencyResult:
+    name: str
+    requests: int
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+def _latencies(name: str, values: List[float]) -> LatencyResult:
+    return LatencyResult(
+        name=name,
+        requests=len(values),
+        p50_ms=_percentile(values, 50),
+        p99_ms=_percentile(values, 99),
+        max_ms=max(values),
+    )
+
+
+def _seeded_pool(directory: str, content: int) -> ConnectionPool:
+    pool = ConnectionPool(
+        database=os.path.join(directory, "benchmark.db"),
+        detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+    )
+    logging.info(f"Seeding {content} content rows...")
+    seed(pool, content, 0)
+    return pool
+
+
+async def _poll(
+    poll: Callable[[str], Awaitable[None]], clients: int, polls: int, interval: float
+) -> List[float]:
+    # Each client polls on a fixed schedule, so a request's latency includes any time it waited
+    # for the event loop to be free, not just the time its own queries took.
+    start = time.perf_counter()
+    latencies = []
+
+    async def client(c: int):
+        for i in range(polls):
+            arrival = start + c * interval / clients + i * interval
+            wait = arrival - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await poll(f"frame-{c % 10}")
+            latencies.append((time.perf_counter() - arrival) * 1000)
+
+    await asyncio.gather(*[client(c) for c in range(clients)])
+    return latencies
+
+
+def frame_polls(
+    content: int,
+    clients: int,
+    polls: int,
+    interval: float,
+    threads: Optional[int] = None,
+    directory: Optional[str] = None,
+) -> List[LatencyResult]:
+    """Measures the latency of frames polling the server in parallel, with the database calls made on the event loop
+    and on an IoPool.
+
+    A poll reads what `/frame/{id}?page_size=100` does: the frame, a page of its content, and its latest pre-render.
+
+    Args:
+        content (int): How many content rows to seed.
+        clients (int): How many frames poll at once.
+        polls (int): How many times each frame polls.
+        interval (float): How many seconds each frame waits between polls.
+        threads (Optional[int]): The size of the IoPool. Defaults to IoPool.DEFAULT_THREADS.
+        directory (Optional[str]): Where to create the temporary database.
+
+    Returns:
+        List[LatencyResult]: The latencies with blocking calls, then with the IoPool.
+    """
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        pool = _seeded_pool(tmp, content)
+        content_db = ContentDb(pool)
+        frames_api = FramesApi(FramesDb(pool), content_db)
+        prerender_db = PreRenderDb(pool)
+
+        async def blocking(id: str) -> None:
+            frames_api.get(id)
+            frames_api.get_content_page(id, 100, None)
+            prerender_db.get_for_frame(frame_id=id, limit=1)
+
+        io_pool = IoPool(threads)
+        async_frames_api = AsyncAdapter(frames_api, io_pool)
+        async_prerender_db = AsyncAdapter(prerender_db, io_pool)
+
+        async def pooled(id: str) -> None:
+            await async_frames_api.get(id)
+            await async_frames_api.get_content_page(id, 100, None)
+            await async_prerender_db.get_for_frame(frame_id=id, limit=1)
+
+        try:
+            return [
+                _latencies("blocking", asyncio.run(_poll(blocking, clients, polls, interval))),
+                _latencies(f"io pool ({io_pool.threads} threads)", asyncio.run(_poll(pooled, clients, polls, interval))),
+            ]
+        finally:
+            io_pool.shutdown()
+
+
+def filter_seen(
+    content: int, items: int, directory: Optional[str] = None
+) -> List[FilterResult]:
+    """Measures what FilterSeen costs per stream item, querying the database for each item
+    and loading the stream's seen set once.
+
+    Args:
+        content (int): How many content rows to seed.
+        items (int): How many stream items to filter. Half of them were already processed.
+        directory (Optional[str]): Where to create the temporary database.
+
+    Returns:
+        List[FilterResult]: The cost of the per-item queries, then of the seen set.
+    """
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        content_db = ContentDb(_seeded_pool(tmp, content))
+        # Pipeline 2 created the seeded content with source ids source-1, source-11, ...; odd items are new.
+        stream_id, pipeline_id = 2, 2
+        sources = [f"source-{1 + 10 * (i // 2) if i % 2 == 0 else -i}" for i in range(items)]
+
+        def per_item() -> int:
+            return sum(
+                len(content_db.query(1, source_id=s, stream_id=stream_id, pipeline_id=pipeline_id)) > 0
+                for s in sources
+            )
+
+        seen = None
+
+        def seen_set() -> int:
+            nonlocal seen
+            seen = content_db.seen_sources(stream_id, pipeline_id)
+            return sum(s in seen for s in sources)
+
+        results = []
+        for name, run in [("query per item", per_item), ("seen set", seen_set)]:
+            start = time.perf_counter()
+            found = run()
+            total = time.perf_counter() - start
+            # Tracing allocations slows them down, so memory is measured on a second, untimed run.
+            tracemalloc.start()
+            run()
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            logging.info(f"{name} found {found} of {items} items already processed.")
+            results.append(
+                FilterResult(
+                    name=name,
+                    items=items,
+                    total_ms=total * 1000,
+                    per_item_us=total * 1e6 / items,
+                    memory_bytes=memory,
+                )
+            )
+        return results
+
+
+def content_reads(
+    content: int, repeat: Optional[int] = 3, directory: Optional[str] = None
+) -> List[ReadResult]:
+    """Measures reading every content row as Content (`ContentDb.query`) and as ContentRows (`ids_and_versions`),
+    which is how playlists and pre-renders list a frame's content.
+
+    Args:
+        content (int): How many content rows to seed and read.
+        repeat (Optional[int]): How many times each read is timed. The fastest is kept.
+        directory (Optional[str]): Where to create the temporary database.
+
+    Returns:
+        List[ReadResult]: The cost of reading Content, then ContentRows.
+    """
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        content_db = ContentDb(_seeded_pool(tmp, content))
+        results = []
+        for name, read in [
+            ("query", lambda: content_db.query(content)),
+            ("ids_and_versions", lambda: content_db.ids_and_versions(content)),
+        ]:
+            timings = []
+            for i in range(repeat):
+                start = time.perf_counter()
+                rows = read()
+                timings.append(time.perf_counter() - start)
+                del rows
+            tracemalloc.start()
+            rows = read()
+            allocated = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append(
+                ReadResult(
+                    name=name,
+                    rows=len(rows),
+                    total_ms=min(timings) * 1000,
+                    allocated_bytes=allocated,
+                )
+            )
+        return results
@@ -3,6 +3,7 @@ Provides a command line interface (CLI) for managing content in kinetic photo se
 
 """
 import argparse
+import concurrent.futures
 import itertools
 import json
 import logging
@@ -11,7 +12,10 @@ import sys
 import tqdm
 from dependency_injector.wiring import Provide, inject
 
+from . import benchmarks, query_plans
 from .containers import Container
+from .content import ContentApi
+from .db import ContentDb
 from .frames import FramesApi
 from .integrations import IntegrationsApi, IntegrationType
 from .object_store import ObjectStore
@@ -200,7 +204,23 @@ def pipelines(
             logging.info(f"Pipeline is now: {new_pipeline}")
         case "run":
             pipeline = pipelines_api.get(args.pipeline_id)
-            pipeline(args.limit)
+            try:
+                pipeline(
+                    args.limit,
+                    concurrency=args.concurrency,
+                    resume=args.resume,
+                    incremental=args.incremental,
+                )
+            except Exception:
+                # The failure is already in the run's log and recorded as a failed run.
+                logging.error(f"Pipeline {pipeline.name} ({pipeline.id}) failed, see its run log for details.")
+        case "run-all":
+            pipelines_api.run_all(
+                args.limit, concurrency=args.concurrency, incremental=args.incremental
+            )
+        case "set-options":
+            pipeline = pipelines_api.set_options(args.pipeline_id, **json.loads(args.options))
+            logging.info(f"Pipeline is now: {pipeline}")
 
 
 def pipelines_parser(app_subparsers: argparse._SubParsersAction):
@@ -248,7 +268,61 @@ def pipelines_parser(app_subparsers: argparse._SubParsersAction):
     run_parser.add_argument(
         "-l", "--limit", type=int, default=None, help="Only process this many media."
     )
+    run_parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=None,
+        help="How many media to process at once. Defaults to the pipeline's concurrency option, or 1.",
+    )
+    run_parser.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        help="Continue from where the last run of this pipeline stopped instead of the start of its stream.",
+    )
+    run_parser.add_argument(
+        "-i",
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Whether to only process media created after the newest media processed by previous runs. Defaults to the pipeline's incremental option.",
+    )
     run_parser.set_defaults(action="run")
+    run_all_parser = subparsers.add_parser(
+        name="run-all",
+        help="Runs every pipeline, reading each stream once for all of the pipelines that use it.",
+    )
+    run_all_parser.add_argument(
+        "-l", "--limit", type=int, default=None, help="Only process this many media in each pipeline."
+    )
+    run_all_parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=None,
+        help="How many media each pipeline processes at once. Defaults to each pipeline's concurrency option, or 1.",
+    )
+    run_all_parser.add_argument(
+        "-i",
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Whether to only process media created after the newest media processed by previous runs. Defaults to each pipeline's incremental option.",
+    )
+    run_all_parser.set_defaults(action="run-all")
+    options_parser = subparsers.add_parser(
+        name="set-options", help="Set options for running a pipeline"
+    )
+    options_parser.add_argument(
+        "pipeline_id", type=int, help="The pipeline to set the options of."
+    )
+    options_parser.add_argument(
+        "options",
+        type=str,
+        help='A json object of options to set, i.e. {"concurrency": 4}. Options set to null are removed.',
+    )
+    options_parser.set_defaults(action="set-options")
     info_parser = subparsers.add_parser(name="info", help="Displays a pipeline")
     info_parser.add_argument("pipeline_id", help="Which pipeline to display.")
     info_parser.set_defaults(action="info")
@@ -295,17 +369,15 @@ def uploads(args, uploads_api: UploadsApi = Provide[Container.uploads_api]) -> N
             uploads_api.remove(id=args.id)
             logging.info(f"Upload {args.id} has been deleted")
         case "add":
-            with open(args.file, "rb") as fin:
-                file_bytes = fin.read()
-            result = uploads_api.add(file_bytes)
-            logging.info("Resulting upload is:\n" + str(result.to_dict()))
+            for result in uploads_api.add_files(args.files):
+                logging.info("Resulting upload is:\n" + str(result.to_dict()))
 
 
 def uploads_parser(app_subparsers: argparse._SubParsersAction):
     parser = app_subparsers.add_parser(name="uploads", help="Manage uploads.")
     subparsers = parser.add_subparsers(metavar="action", required=True)
     add_parser = subparsers.add_parser(name="add", help="Injest some new media")
-    add_parser.add_argument("file", help="The file to injest")
+    add_parser.add_argument("files", nargs="+", help="The files to injest")
     add_parser.set_defaults(action="add")
     list_parser = subparsers.add_parser(name="list", help="List uploads")
     list_parser.set_defaults(action="list")
@@ -385,10 +457,163 @@ def pre_renders_parser(app_subparsers: argparse._SubParsersAction):
     parser.set_defaults(func=prerenders)
 
 
+@inject
+def objectstore(
+    args, objectstore: ObjectStore = Provide[Container.object_store]
+) -> None:
+    match args.action:
+        case "migrate":
+            # The list is materialized first so that moving files doesn't disturb the directory scan.
+            legacy = list(objectstore.list_legacy())
+            logging.info(f"There are {len(legacy)} objects to migrate.")
+            skipped = 0
+            for hash in tqdm.tqdm(legacy, total=len(legacy)):
+                if not objectstore.migrate(hash):
+                    skipped += 1
+            logging.info(f"Done migrating the object store, {skipped} objects had already been moved.")
+
+
+def objectstore_parser(app_subparsers: argparse._SubParsersAction):
+    parser = app_subparsers.add_parser(
+        name="objectstore", help="Manage the object store."
+    )
+    subparsers = parser.add_subparsers(metavar="action", required=True)
+    migrate_parser = subparsers.add_parser(
+        name="migrate",
+        help="Moves objects stored in the legacy flat layout into sharded directories. Safe to run while the server is up.",
+    )
+    migrate_parser.set_defaults(action="migrate")
+    parser.set_defaults(func=objectstore)
+
+
+@inject
+def _probe_videos(
+    threads: int,
+    content_db: ContentDb = Provide[Container.content_db],
+    content_api: ContentApi = Provide[Container.content_api],
+) -> None:
+    ids = content_db.missing_video_info()
+    logging.info(f"There are {len(ids)} videos to probe.")
+    # ffprobe runs in other processes, so threads are enough to probe in parallel.
+    # Results are written from this thread as they come in.
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        for id, info in tqdm.tqdm(
+            zip(ids, executor.map(content_api.probe, ids)), total=len(ids)
+        ):
+            # Failures are recorded too, so videos that can't be probed aren't tried again on the next run.
+            content_db.record_probe(id, info)
+    logging.info(f"Done probing videos.")
+
+
+def database(args) -> None:
+    match args.action:
+        case "check-plans":
+            results = query_plans.check_plans(args.content, args.runs)
+            for r in results:
+                logging.info(f"{'FAIL' if r.failed else 'ok':4} {r.median_ms:9.2f}ms  {r.name}")
+                if r.failed or args.verbose:
+                    for p in r.plans:
+                        logging.info(f"     {p.sql}")
+                        for step in p.plan:
+                            logging.info(f"       {step}")
+            failed = [r.name for r in results if r.failed]
+            if failed:
+                logging.error(f"{len(failed)} queries scan or sort a whole table: {', '.join(failed)}")
+                sys.exit(1)
+        case "probe-videos":
+            _probe_videos(args.threads)
+        case "benchmark-filter-seen":
+            for r in benchmarks.filter_seen(args.content, args.items):
+                logging.info(
+                    f"{r.name}: {r.items} items in {r.total_ms:.2f}ms, {r.per_item_us:.2f}us per item, "
+                    f"{r.memory_bytes / 1024 / 1024:.2f}MB held"
+                )
+        case "benchmark-content-reads":
+            for r in benchmarks.content_reads(args.content):
+                logging.info(
+                    f"{r.name}: {r.rows} rows in {r.total_ms:.2f}ms, {r.allocated_bytes / 1024 / 1024:.2f}MB allocated"
+                )
+        case "benchmark-frame-polls":
+            results = benchmarks.frame_polls(
+                args.content, args.clients, args.polls, args.interval, args.threads
+            )
+            for r in results:
+                logging.info(
+                    f"{r.name}: {r.requests} polls, p50 {r.p50_ms:.2f}ms, p99 {r.p99_ms:.2f}ms, max {r.max_ms:.2f}ms"
+                )
+
+
+def database_parser(app_subparsers: argparse._SubParsersAction):
+    parser = app_subparsers.add_parser(name="database", help="Database maintenance.")
+    subparsers = parser.add_subparsers(metavar="action", required=True)
+    check_plans_parser = subparsers.add_parser(
+        name="check-plans",
+        help="Seeds a temporary database and checks that every query uses an index. Exits with an error if one doesn't.",
+    )
+    check_plans_parser.add_argument(
+        "--content", type=int, default=100000, help="How many content rows to seed."
+    )
+    check_plans_parser.add_argument(
+        "--runs", type=int, default=10000, help="How many pipeline runs to seed."
+    )
+    check_plans_parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Print the query plan of every query."
+    )
+    check_plans_parser.set_defaults(action="check-plans")
+    probe_videos_parser = subparsers.add_parser(
+        name="probe-videos",
+        help="Reads the duration, frame rate, frame count, codec, size and audio of content that hasn't been probed yet.",
+    )
+    probe_videos_parser.add_argument(
+        "-t", "--threads", type=int, default=8, help="How many videos to probe at once."
+    )
+    probe_videos_parser.set_defaults(action="probe-videos")
+    filter_seen_parser = subparsers.add_parser(
+        name="benchmark-filter-seen",
+        help="Seeds a temporary database and compares querying for each stream item with loading the stream's seen set.",
+    )
+    filter_seen_parser.add_argument(
+        "--content", type=int, default=500000, help="How many content rows to seed."
+    )
+    filter_seen_parser.add_argument(
+        "--items", type=int, default=100000, help="How many stream items to filter."
+    )
+    filter_seen_parser.set_defaults(action="benchmark-filter-seen")
+    content_reads_parser = subparsers.add_parser(
+        name="benchmark-content-reads",
+        help="Seeds a temporary database and compares reading content as Content and as lightweight ContentRows.",
+    )
+    content_reads_parser.add_argument(
+        "--content", type=int, default=100000, help="How many content rows to seed and read."
+    )
+    content_reads_parser.set_defaults(action="benchmark-content-reads")
+    frame_polls_parser = subparsers.add_parser(
+        name="benchmark-frame-polls",
+        help="Seeds a temporary database and measures the latency of frames polling in parallel, with and without the I/O pool.",
+    )
+    frame_polls_parser.add_argument(
+        "--content", type=int, default=100000, help="How many content rows to seed."
+    )
+    frame_polls_parser.add_argument(
+        "--clients", type=int, default=50, help="How many frames poll at once."
+    )
+    frame_polls_parser.add_argument(
+        "--polls", type=int, default=20, help="How many times each frame polls."
+    )
+    frame_polls_parser.add_argument(
+        "--interval", type=float, default=0.5, help="How many seconds each frame waits between polls."
+    )
+    frame_polls_parser.add_argument(
+        "-t", "--threads", type=int, default=None, help="How many threads the I/O pool has."
+    )
+    frame_polls_parser.set_defaults(action="benchmark-frame-polls")
+    parser.set_defaults(func=database)
+
+
 def main():
     container = Container()
     container.init_resources()
-    container.wire(modules=[__name__])
+    container.wire(modules=[__name__, "kinetic_server.steps._apis"])
 
     parser = argparse.ArgumentParser(
         prog="kinetic-cli", description="Command line interface for kinetic photos."
@@ -400,6 +625,8 @@ def main():
     frames_parser(subparsers)
     uploads_parser(subparsers)
     pre_renders_parser(subparsers)
+    objectstore_parser(subparsers)
+    database_parser(subparsers)
 
     args = parser.parse_args()
     args.func(args)
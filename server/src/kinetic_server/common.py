@@ -1,7 +1,9 @@
+import base64
+import json
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple, Union
 
 from dataclasses_json import config, dataclass_json
 from marshmallow import fields
@@ -18,6 +20,21 @@ class Resolution:
     height: int
 
 
+@dataclass_json
+@dataclass
+class VideoInfo:
+    """
+    Facts about a video file, read with ffprobe. Any of them may be unknown.
+    """
+
+    duration: Optional[float] = None  # Length of the video in seconds
+    fps: Optional[float] = None  # Frames per second of the video stream
+    codec: Optional[str] = None  # Codec of the video stream, i.e. h264
+    bytes: Optional[int] = None  # Size of the file
+    has_audio: Optional[bool] = None  # Whether the file has an audio stream
+    frames: Optional[int] = None  # Number of frames in the video stream
+
+
 @dataclass_json
 @dataclass
 class StreamMedia:
@@ -73,6 +90,59 @@ class Content:
     ] = None  # The id used by the source provider -- i.e., google photos id.
     stream_id: Optional[int] = None  # Which stream contained the original media
     poster: Optional[str] = None  # Hash of the poster image in the object store
+    video_info: Optional[VideoInfo] = None  # Duration, frame rate, etc. of the original video
+
+
+class ContentRow:
+    """A lightweight, read-only view of a piece of content holding only what lists of content
+    (i.e., playlists) need. Rows are cheap to create: versions are decoded the first time they are read.
+    """
+
+    __slots__ = ("id", "created_at", "duration", "_versions")
+
+    def __init__(
+        self, id: str, created_at: datetime, duration: Optional[float], versions: str
+    ):
+        self.id = id
+        self.created_at = created_at
+        self.duration = duration  # Length of the video in seconds, if known
+        self._versions = versions  # The json encoded versions, until decoded
+
+    @property
+    def versions(self) -> Dict[ContentVersion, str]:
+        """A map of version identifier -> object id for different versions of this media."""
+        if isinstance(self._versions, str):
+            self._versions = json.loads(self._versions)
+        return self._versions
+
+    def __repr__(self) -> str:
+        return f"ContentRow(id={self.id!r}, created_at={self.created_at!r})"
+
+
+@dataclass
+class ContentCursor:
+    """A position in a list of content ordered by (created_at, id), used for keyset pagination."""
+
+    created_at: datetime
+    id: str
+
+    @staticmethod
+    def of(c: Union[Content, "ContentRow"]) -> "ContentCursor":
+        """Returns the position of the provided content."""
+        return ContentCursor(c.created_at, c.id)
+
+    def encode(self) -> str:
+        """Encodes this cursor into an opaque string for api clients."""
+        return base64.urlsafe_b64encode(
+            json.dumps([self.created_at.isoformat(), self.id]).encode()
+        ).decode()
+
+    @staticmethod
+    def decode(s: str) -> "ContentCursor":
+        """Decodes a cursor created with `encode`."""
+        created_at, id = json.loads(base64.urlsafe_b64decode(s.encode()))
+        return ContentCursor(datetime.fromisoformat(created_at), id)
+
 
 class PipelineStatus(Enum):
     Successful = "Successful"
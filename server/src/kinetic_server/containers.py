@@ -10,6 +10,7 @@ from .uploads import UploadsApi
 from .pre_renders import PreRenderApi
 
 from .content import ContentApi
+from .delivery import ObjectDelivery
 from .db import (
     ContentDb,
     AuxiliaryCacheDb,
@@ -19,10 +20,12 @@ from .db import (
     PreRenderDb,
     StreamsDb,
     UploadsDb,
-    WrappedConnection,
+    ConnectionPool,
 )
 from .auxiliarycache import AuxiliaryCache
 from .integrations import IntegrationsApi
+from .io_pool import AsyncAdapter, IoPool
+from .manifests import FrameManifestCache
 from .object_store import ObjectStore
 from .pipelines import PipelineApi, PipelineLoggerFactory
 from .streams import StreamsApi
@@ -38,30 +41,47 @@ class Container(containers.DeclarativeContainer):
         fname=os.path.join(os.path.dirname(__file__), "logging.ini"),
     )
 
-    database_connection = providers.ThreadLocalSingleton(
-        WrappedConnection,
+    database = providers.Singleton(
+        ConnectionPool,
         database=config.db.database,
+        readers=config.db.readers,
+        busy_timeout=config.db.busy_timeout,
+        journal_mode=config.db.journal_mode,
+        synchronous=config.db.synchronous,
+        mmap_size=config.db.mmap_size,
+        cache_size=config.db.cache_size,
         detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
     )
-    object_store = providers.ThreadLocalSingleton(
-        ObjectStore, config.objectstore.folder
+    # One store is shared by every thread (i.e., pipeline stage workers); it keeps no per-thread state.
+    object_store = providers.Singleton(
+        ObjectStore, config.objectstore.folder, config.objectstore.fsync
+    )
+    object_delivery = providers.Singleton(
+        ObjectDelivery,
+        object_store,
+        config.server.offload,
+        config.server.offload_prefix,
     )
 
-    integrations_db = providers.Singleton(IntegrationsDb, database_connection)
+    integrations_db = providers.Singleton(IntegrationsDb, database)
     integrations_api = providers.Singleton(IntegrationsApi, integrations_db)
 
-    uploads_db = providers.Singleton(UploadsDb, database_connection)
+    uploads_db = providers.Singleton(UploadsDb, database, config.db.batch_size)
     uploads_api = providers.Singleton(UploadsApi, uploads_db, object_store)
 
-    streams_db = providers.Singleton(StreamsDb, database_connection)
+    streams_db = providers.Singleton(StreamsDb, database)
     streams_api = providers.Singleton(
         StreamsApi, streams_db, integrations_api, uploads_api
     )
 
-    content_db = providers.Singleton(ContentDb, database_connection)
+    frame_manifests = providers.Singleton(FrameManifestCache, config.server.manifest_ttl)
+
+    content_db = providers.Singleton(
+        ContentDb, database, frame_manifests, config.db.batch_size
+    )
     content_api = providers.Singleton(ContentApi, object_store)
 
-    pipeline_db = providers.Singleton(PipelineDb, database_connection)
+    pipeline_db = providers.Singleton(PipelineDb, database)
     pipeline_logger_factory = providers.Singleton(
         PipelineLoggerFactory, pipeline_db, object_store
     )
@@ -69,17 +89,25 @@ class Container(containers.DeclarativeContainer):
         PipelineApi, pipeline_db, content_db, pipeline_logger_factory, streams_api
     )
 
-    frames_db = providers.Singleton(FramesDb, database_connection)
+    frames_db = providers.Singleton(FramesDb, database, frame_manifests)
     frames_api = providers.Singleton(FramesApi, frames_db, content_db)
 
-    auxiliary_db = providers.Singleton(AuxiliaryCacheDb, database_connection)
+    auxiliary_db = providers.Singleton(AuxiliaryCacheDb, database)
     auxiliary_cache = providers.Singleton(AuxiliaryCache, auxiliary_db, object_store)
 
-    prerender_db = providers.Singleton(PreRenderDb, database_connection)
+    prerender_db = providers.Singleton(PreRenderDb, database, frame_manifests)
     prerender_api = providers.Singleton(
         PreRenderApi, prerender_db, object_store, frames_api
     )
 
+    # The server's endpoints are async, so they reach the databases and object store through these
+    # adapters that run the blocking calls on a bounded pool of threads.
+    io_pool = providers.Singleton(IoPool, config.server.io_threads)
+    async_content_db = providers.Singleton(AsyncAdapter, content_db, io_pool)
+    async_frames_api = providers.Singleton(AsyncAdapter, frames_api, io_pool)
+    async_prerender_db = providers.Singleton(AsyncAdapter, prerender_db, io_pool)
+    async_object_store = providers.Singleton(AsyncAdapter, object_store, io_pool)
+
 
 @inject
 def example(api=Provide[Container.integrations_api]):
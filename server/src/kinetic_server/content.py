@@ -1,34 +1,112 @@
-from typing import Dict, Optional
+import json
+import logging
+import os
+import subprocess
+from fractions import Fraction
+from typing import BinaryIO, Dict, Optional, Union
 
 from .object_store import ObjectStore
-from .common import Content, ContentVersion, Resolution
+from .common import Content, ContentVersion, Resolution, VideoInfo
 from datetime import datetime
 
 
+def probe_video(filename: str) -> VideoInfo:
+    """Reads the duration, frame rate, frame count, codec, size and audio of a video file with ffprobe.
+    Unlike counting frames, this only reads the file's headers, so it's fast. Some containers (i.e., webm) don't
+    record how many frames they have, so the frame count may be unknown.
+
+    Args:
+        filename (str): The video file to probe.
+
+    Returns:
+        VideoInfo: What was found. Facts ffprobe doesn't report are None.
+    """
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration,size:stream=codec_type,codec_name,avg_frame_rate,nb_frames,duration",
+            "-print_format",
+            "json",
+            filename,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    info = json.loads(result.stdout)
+    streams = info.get("streams", [])
+    fmt = info.get("format", {})
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    frames = int(video["nb_frames"]) if video.get("nb_frames", "N/A").isdigit() else None
+    video_duration = float(video["duration"]) if video.get("duration", "N/A") != "N/A" else None
+    if frames and video_duration:
+        # The video stream's own frame count and duration give the true average rate of variable frame rate clips,
+        # and aren't thrown off by audio that starts before or ends after the video like the container's duration.
+        fps = frames / video_duration
+    else:
+        # Frame rates are fractions like 30000/1001; 0/0 means unknown.
+        rate = video.get("avg_frame_rate", "0/0")
+        fps = float(Fraction(rate)) if rate and not rate.endswith("/0") else None
+    return VideoInfo(
+        duration=float(fmt["duration"]) if "duration" in fmt else None,
+        fps=fps if fps else None,
+        codec=video.get("codec_name"),
+        bytes=int(fmt["size"]) if "size" in fmt else os.path.getsize(filename),
+        has_audio=any(s.get("codec_type") == "audio" for s in streams),
+        frames=frames,
+    )
+
+
 class ContentApi:
     def __init__(self, objectstore: ObjectStore):
         self.objectstore = objectstore
 
+    def _add(self, file: Union[bytes, BinaryIO]) -> str:
+        if isinstance(file, bytes):
+            return self.objectstore.add(file)
+        return self.objectstore.add_stream(file)
+
+    def probe(self, id: str) -> Optional[VideoInfo]:
+        """Probes a video in the object store.
+
+        Args:
+            id (str): The hash of the video.
+
+        Returns:
+            Optional[VideoInfo]: The video's info, or None if it couldn't be probed.
+        """
+        try:
+            return probe_video(self.objectstore.path(id))
+        except Exception as e:
+            logging.warning(f"Could not probe video {id}", exc_info=e)
+            return None
+
     def create(
         self,
-        video_file: bytes,
+        video_file: Union[bytes, BinaryIO],
         resolution: Optional[Resolution],
         created_at: datetime,
         source_id: Optional[str] = None,
         metadata: Optional[dict] = None,
         stream_id: Optional[int] = None,
-        versions: Dict[ContentVersion, bytes] = {},
+        versions: Dict[ContentVersion, Union[bytes, BinaryIO]] = {},
         pipeline_id: Optional[int] = None,
-        poster_file: Optional[bytes] = None
+        poster_file: Optional[Union[bytes, BinaryIO]] = None
     ) -> Content:
-        hash = self.objectstore.add(video_file)
-        versions = {k:self.objectstore.add(v) for k,v in versions.items()}
+        """Stores the provided files in the object store and returns a new piece of Content for them.
+        Files can be passed as bytes or as file-like objects, which are streamed into the object store.
+        """
+        hash = self._add(video_file)
+        versions = {k:self._add(v) for k,v in versions.items()}
         versions[ContentVersion.Original] = hash
         
         # Store poster if provided
         poster_hash = None
         if poster_file:
-            poster_hash = self.objectstore.add(poster_file)
+            poster_hash = self._add(poster_file)
             
         # sqllite3 throws when reading back a timestamp with timezone info
         # (see https://stackoverflow.com/questions/48614488/python-sqlite-valueerror-invalid-literal-for-int-with-base-10-b5911)
@@ -44,5 +122,6 @@ class ContentApi:
             metadata=metadata,
             stream_id=stream_id,
             versions=versions,
-            poster=poster_hash
+            poster=poster_hash,
+            video_info=self.probe(hash),
         )
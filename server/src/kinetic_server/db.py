@@ -1,15 +1,22 @@
 import glob
+import itertools
 import json
 import logging
 import os
+import queue
 import sqlite3
-from datetime import datetime
-from typing import List, Optional, Tuple
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import (Any, Callable, Dict, Generic, Iterable, Iterator, List,
+                    Optional, Set, Tuple, TypeVar, Union)
 
 import pandas as pd
 
-from .common import (Content, AuxiliaryData, Frame, PipelineRun, PipelineStatus,
-                     PreRender, Resolution, Upload)
+from .common import (Content, AuxiliaryData, ContentCursor, ContentRow, Frame, PipelineRun,
+                     PipelineStatus, PreRender, Resolution, Upload, VideoInfo)
+from .manifests import FrameManifestCache
 from .steps import Step, list_steps, step_adapter, step_converter
 
 
@@ -36,6 +43,24 @@ def _set_pragmas(connection: sqlite3.Connection) -> None:
         connection.execute("PRAGMA foreign_keys = ON")
 
 
+def _set_tuning_pragmas(connection: sqlite3.Connection, pragmas: Dict[str, Any]) -> None:
+    # journal_mode can't be changed inside a transaction, so these are run outside of one.
+    for name, value in pragmas.items():
+        connection.execute(f"PRAGMA {name} = {value}")
+
+
+def _timestamp_parameter(value: Optional[Union[str, datetime]]) -> Optional[datetime]:
+    # Timestamps are stored without a timezone, so parameters are converted to naive (utc) datetimes that
+    # compare correctly against the stored values, as sqlite's datetime() would have.
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 def pipeline_status_adapter(s: PipelineStatus) -> str:
     return s.name
 
@@ -54,29 +79,186 @@ def _setup_types() -> None:
 
 
 class WrappedConnection(sqlite3.Connection):
-    def __init__(self, **args):
+    def __init__(
+        self,
+        pragmas: Optional[Dict[str, Any]] = None,
+        migrate: Optional[bool] = True,
+        **args,
+    ):
         _setup_types()
         super().__init__(**args)
-        _update_database_if_needed(self)
+        if pragmas:
+            _set_tuning_pragmas(self, pragmas)
+        if migrate:
+            _update_database_if_needed(self)
         _set_pragmas(self)
 
 
-class StreamsDb:
-    def __init__(self, connection: sqlite3.Connection):
-        self.connection = connection
+class ConnectionPool:
+    """Hands out connections to the database.
 
+    Every write goes through a single writer connection, one thread at a time.
+    Reads use a bounded pool of read-only connections that are opened as they're needed.
+    In WAL mode readers keep seeing the last committed data while a write is in progress, so the server keeps
+    serving frames while `kinetic-cli pipelines run` saves content. The busy timeout makes a write wait for
+    another process's write to finish instead of failing with `database is locked`.
+    """
+
+    DEFAULT_READERS = 4
+    DEFAULT_BUSY_TIMEOUT = 5000  # milliseconds
+    DEFAULT_JOURNAL_MODE = "WAL"
+    DEFAULT_SYNCHRONOUS = "NORMAL"  # Safe in WAL mode; a power loss can only lose the last few commits.
+    DEFAULT_MMAP_SIZE = 256 * 1024 * 1024  # bytes
+    DEFAULT_CACHE_SIZE = -16000  # Negative values are in KiB, so 16MB per connection.
+
+    def __init__(
+        self,
+        database: str,
+        readers: Optional[int] = None,
+        busy_timeout: Optional[int] = None,
+        journal_mode: Optional[str] = None,
+        synchronous: Optional[str] = None,
+        mmap_size: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        **args,
+    ):
+        """Creates a new pool and opens the writer connection, updating the database's schema if needed.
+
+        Args:
+            database (str): The database to connect to.
+            readers (Optional[int]): The most read connections that may be open at once.
+            busy_timeout (Optional[int]): How many milliseconds to wait for another connection's lock.
+            journal_mode (Optional[str]): The sqlite journal mode.
+            synchronous (Optional[str]): The sqlite synchronous setting.
+            mmap_size (Optional[int]): How many bytes of the database each connection may memory map.
+            cache_size (Optional[int]): The page cache size of each connection (see sqlite's cache_size pragma).
+            **args: Passed to sqlite3.connect (i.e., detect_types).
+        """
+        self.database = database
+        self.readers = readers if readers else ConnectionPool.DEFAULT_READERS
+        self._args = args
+        self._pragmas = {
+            "busy_timeout": busy_timeout if busy_timeout else ConnectionPool.DEFAULT_BUSY_TIMEOUT,
+            "synchronous": synchronous if synchronous else ConnectionPool.DEFAULT_SYNCHRONOUS,
+            "mmap_size": mmap_size if mmap_size is not None else ConnectionPool.DEFAULT_MMAP_SIZE,
+            "cache_size": cache_size if cache_size else ConnectionPool.DEFAULT_CACHE_SIZE,
+        }
+
+        # Only the writer runs migrations, and it's opened first so readers always see the latest schema.
+        self._writer = WrappedConnection(
+            pragmas={
+                "journal_mode": journal_mode if journal_mode else ConnectionPool.DEFAULT_JOURNAL_MODE,
+                **self._pragmas,
+            },
+            database=database,
+            check_same_thread=False,
+            **args,
+        )
+        self._writer_lock = threading.RLock()
+
+        self._idle_readers: queue.LifoQueue = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(self.readers)
+
+    def _open_reader(self) -> sqlite3.Connection:
+        return WrappedConnection(
+            pragmas={**self._pragmas, "query_only": "ON"},
+            migrate=False,
+            database=self.database,
+            check_same_thread=False,
+            **self._args,
+        )
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Locks the writer connection for the calling thread. The transaction is committed when the block exits,
+        or rolled back if it raises."""
+        with self._writer_lock:
+            with self._writer:
+                yield self._writer
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrows a read-only connection, waiting for one if they're all in use."""
+        with self._reader_slots:
+            try:
+                connection = self._idle_readers.get_nowait()
+            except queue.Empty:
+                connection = self._open_reader()
+            try:
+                yield connection
+            finally:
+                self._idle_readers.put(connection)
+
+
+T = TypeVar("T")
+
+# How many rows bulk writes commit at once.
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _batches(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    items = iter(items)
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+
+class BatchWriter(Generic[T]):
+    """Buffers items that are saved one at a time and writes them with a `save_many` method instead,
+    a batch at a time. Anything still buffered is written when the `with` block exits, even if it raised.
+
+    For example:
+
+    with content_db.batch() as batch:
+        for c in contents:
+            batch.save(c)
+    """
+
+    def __init__(self, save_many: Callable[[List[T]], int], batch_size: int):
+        self._save_many = save_many
+        self._batch_size = batch_size
+        self._pending: List[T] = []
+
+    def save(self, item: T) -> None:
+        self._pending.append(item)
+        if len(self._pending) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self._save_many(pending)
+
+    def __enter__(self) -> "BatchWriter[T]":
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.flush()
+
+
+class _Db:
+    def __init__(self, pool: ConnectionPool):
+        """Creates a new database accessor
+
+        Args:
+            pool (ConnectionPool): Where connections are borrowed from. The pool's connections can be used from any thread,
+                so accessors can be called from the server's I/O threads.
+        """
+        self.pool = pool
+
+
+class StreamsDb(_Db):
     def list(self) -> pd.DataFrame:
         """
         Lists all streams in the datastore.
         """
-        with self.connection:
+        with self.pool.reader() as connection:
             return pd.read_sql_query(
-                "SELECT * FROM streams", self.connection, index_col="id"
+                "SELECT * FROM streams", connection, index_col="id"
             )
 
     def get(self, id: int):
-        with self.connection:
-            return self.connection.execute(
+        with self.pool.reader() as connection:
+            return connection.execute(
                 "SELECT * FROM streams WHERE id = ?", (id,)
             ).fetchone()
 
@@ -84,8 +266,8 @@ class StreamsDb:
         """
         Removes a streams from the datastore.
         """
-        with self.connection:
-            self.connection.execute("DELETE FROM streams WHERE id = ?", (id,))
+        with self.pool.writer() as connection:
+            connection.execute("DELETE FROM streams WHERE id = ?", (id,))
 
     def add(
         self,
@@ -97,8 +279,8 @@ class StreamsDb:
         """
         Saves a new streams to the datastore and returns it's id.
         """
-        with self.connection:
-            cursor = self.connection.cursor()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
             cursor.execute(
                 "INSERT INTO streams(name, type, integration_id, params_json) VALUES(?, ?, ?, ?)",
                 (name, type, integration_id, params),
@@ -106,22 +288,19 @@ class StreamsDb:
             return cursor.lastrowid
 
 
-class IntegrationsDb:
-    def __init__(self, connection: sqlite3.Connection):
-        self.connection = connection
-
+class IntegrationsDb(_Db):
     def list(self) -> pd.DataFrame:
         """
         Lists all integrations in the datastore.
         """
-        with self.connection:
+        with self.pool.reader() as connection:
             return pd.read_sql_query(
-                "SELECT * FROM integrations", self.connection, index_col="id"
+                "SELECT * FROM integrations", connection, index_col="id"
             )
 
     def get(self, id: int):
-        with self.connection:
-            return self.connection.execute(
+        with self.pool.reader() as connection:
+            return connection.execute(
                 "SELECT * FROM integrations WHERE id = ?", (id,)
             ).fetchone()
 
@@ -129,15 +308,15 @@ class IntegrationsDb:
         """
         Removes an integration from the datastore.
         """
-        with self.connection:
-            self.connection.execute("DELETE FROM integrations WHERE id = ?", (id,))
+        with self.pool.writer() as connection:
+            connection.execute("DELETE FROM integrations WHERE id = ?", (id,))
 
     def add(self, name: str, type: str, params) -> int:
         """
         Saves a new integration to the datastore and returns it's id.
         """
-        with self.connection:
-            cursor = self.connection.cursor()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
             cursor.execute(
                 "INSERT INTO integrations(name, type, params) VALUES(?, ?, ?)",
                 (name, type, params),
@@ -145,43 +324,200 @@ class IntegrationsDb:
             return cursor.lastrowid
 
 
-class ContentDb:
-    def __init__(self, connection: sqlite3.Connection):
-        self.connection = connection
+# Content is read by column name because the table has generated columns that aren't part of Content.
+_CONTENT_COLUMNS = "id, created_at, height, metadata, pipeline_id, processed_at, source_id, stream_id, width, versions, poster, duration, fps, codec, bytes, has_audio, frames"
+
+
+_VIDEO_INFO_COLUMNS = ("duration", "fps", "codec", "bytes", "has_audio", "frames")
+
+
+def _video_info_values(info: Optional[VideoInfo], metadata: Optional[dict]) -> tuple:
+    """Returns the values of the video info columns, in the order of _VIDEO_INFO_COLUMNS."""
+    values = dict.fromkeys(_VIDEO_INFO_COLUMNS)
+    if info is not None:
+        values.update(info.to_dict())
+    # Like the migration that added the columns, fall back to the duration older steps put in the metadata.
+    if values["duration"] is None and metadata and isinstance(metadata.get("duration"), (int, float)):
+        values["duration"] = metadata["duration"]
+    return tuple(values[name] for name in _VIDEO_INFO_COLUMNS)
+
+
+def _video_info_of(
+    duration: Optional[float],
+    fps: Optional[float],
+    codec: Optional[str],
+    bytes: Optional[int],
+    has_audio: Optional[int],
+    frames: Optional[int],
+) -> Optional[VideoInfo]:
+    if all(v is None for v in (duration, fps, codec, bytes, has_audio, frames)):
+        return None
+    return VideoInfo(
+        duration=duration,
+        fps=fps,
+        codec=codec,
+        bytes=bytes,
+        has_audio=bool(has_audio) if has_audio is not None else None,
+        frames=frames,
+    )
+
+
+def _content_row(c: Content) -> tuple:
+    # sqllite3 throws when reading back a timestamp with timezone info
+    # (see https://stackoverflow.com/questions/48614488/python-sqlite-valueerror-invalid-literal-for-int-with-base-10-b5911)
+    # Just check that the values passed don't have timezone info
+    if c.created_at.tzinfo is not None:
+        raise Exception(
+            f"Due to an sqlite bug, created_at must have no timezone"
+        )
+    if c.processed_at.tzinfo is not None:
+        raise Exception(
+            f"Due to an sqlite bug, processed_at must have no timezone"
+        )
+    return (
+        c.id,
+        c.created_at,
+        c.processed_at,
+        c.resolution.height if c.resolution else None,
+        c.resolution.width if c.resolution else None,
+        c.source_id,
+        json.dumps(c.metadata) if c.metadata is not None else None,
+        c.stream_id,
+        c.pipeline_id,
+        json.dumps(c.versions),
+        c.poster,
+        *_video_info_values(c.video_info, c.metadata),
+    )
+
+
+_UPSERT_CONTENT = """
+INSERT INTO content (id, created_at, processed_at, height, width, source_id, metadata, stream_id, pipeline_id, versions, poster, duration, fps, codec, bytes, has_audio, frames)
+VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    created_at = excluded.created_at,
+    processed_at = excluded.processed_at,
+    height = excluded.height,
+    width = excluded.width,
+    source_id = excluded.source_id,
+    metadata = excluded.metadata,
+    stream_id = excluded.stream_id,
+    pipeline_id = excluded.pipeline_id,
+    versions = excluded.versions,
+    poster = excluded.poster,
+    duration = excluded.duration,
+    fps = excluded.fps,
+    codec = excluded.codec,
+    bytes = excluded.bytes,
+    has_audio = excluded.has_audio,
+    frames = excluded.frames
+"""
+
+_UPDATABLE_CONTENT_COLUMNS = set(
+    ["created_at", "processed_at", "height", "width", "source_id", "stream_id", "pipeline_id", "poster"]
+    + list(_VIDEO_INFO_COLUMNS)
+)
+
+
+def _search_query(text: str) -> str:
+    # Each word is quoted so that user input can't be read as fts5 query syntax, and matched as a prefix so that
+    # results show up while a word is still being typed. Every word has to match.
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+
+def _json_key(key: str) -> str:
+    # Quotes the key so that keys with dots or spaces aren't read as a longer path.
+    return '$."' + key + '"'
+
+
+class ContentDb(_Db):
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        manifests: Optional[FrameManifestCache] = None,
+        batch_size: Optional[int] = None,
+    ):
+        super().__init__(pool)
+        self.manifests = manifests
+        self.batch_size = batch_size if batch_size else DEFAULT_BATCH_SIZE
 
     def save(self, c: Content):
-        metadata = c.metadata
-        if c.metadata:
-            metadata = json.dumps(c.metadata)
-        versions = json.dumps(c.versions)
-        with self.connection:
-            # sqllite3 throws when reading back a timestamp with timezone info
-            # (see https://stackoverflow.com/questions/48614488/python-sqlite-valueerror-invalid-literal-for-int-with-base-10-b5911)
-            # Just check that the values passed don't have timezone info
-            if c.created_at.tzinfo is not None:
-                raise Exception(
-                    f"Due to an sqlite bug, created_at must have no timezone"
-                )
-            if c.processed_at.tzinfo is not None:
-                raise Exception(
-                    f"Due to an sqlite bug, processed_at must have no timezone"
-                )
-            self.connection.execute(
-                "REPLACE INTO content (id, created_at, processed_at, height, width, source_id, metadata, stream_id, pipeline_id, versions, poster) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                (
-                    c.id,
-                    c.created_at,
-                    c.processed_at,
-                    c.resolution.height if c.resolution else None,
-                    c.resolution.width if c.resolution else None,
-                    c.source_id,
-                    metadata,
-                    c.stream_id,
-                    c.pipeline_id,
-                    versions,
-                    c.poster,
-                ),
+        self.save_many([c])
+
+    def save_many(self, contents: Iterable[Content], batch_size: Optional[int] = None) -> int:
+        """Stores content in batches. Each batch is written with one statement in a single transaction,
+        so bulk imports commit once per batch rather than once per item.
+
+        Args:
+            contents (Iterable[Content]): The content to store.
+            batch_size (Optional[int]): How many items are committed at once. Defaults to this database's batch_size.
+
+        Returns:
+            int: How many items were stored.
+        """
+        count = 0
+        for batch in _batches(contents, batch_size if batch_size else self.batch_size):
+            rows = [_content_row(c) for c in batch]
+            with self.pool.writer() as connection:
+                connection.executemany(_UPSERT_CONTENT, rows)
+            count += len(rows)
+        # Any frame's query could match this content.
+        if count and self.manifests:
+            self.manifests.invalidate()
+        return count
+
+    def batch(self) -> BatchWriter[Content]:
+        """Returns a BatchWriter that saves content through save_many."""
+        return BatchWriter(self.save_many, self.batch_size)
+
+    def get(self, id: str) -> Optional[Content]:
+        """Looks up a single piece of content by id"""
+        res = self.query(1, ids=[id])
+        return res[0] if res else None
+
+    def update_fields(
+        self,
+        id: str,
+        versions: Optional[Dict[str, str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **columns,
+    ) -> None:
+        """Updates some fields of existing content in place, leaving everything else untouched.
+        Unlike save, which rewrites the whole row, only the provided columns and json keys are written.
+
+        Args:
+            id (str): The content to update.
+            versions (Optional[Dict[str, str]]): Versions to add or replace. Other versions are kept.
+            metadata (Optional[Dict[str, Any]]): Metadata keys to add or replace. Other keys are kept.
+            **columns: Other columns to set (i.e., poster=..., processed_at=...).
+        """
+        unknown = set(columns) - _UPDATABLE_CONTENT_COLUMNS
+        if unknown:
+            raise Exception(f"Can't update unknown content columns {unknown}")
+
+        assignments = []
+        parameters = ()
+        for name, value in columns.items():
+            if isinstance(value, datetime) and value.tzinfo is not None:
+                raise Exception(f"Due to an sqlite bug, {name} must have no timezone")
+            assignments.append(f"{name} = ?")
+            parameters += (value,)
+        for name, values in [("versions", versions), ("metadata", metadata)]:
+            if values:
+                # json_set takes (path, value) pairs; values are passed as json so nested values keep their type.
+                pairs = ", ".join(["?, json(?)"] * len(values))
+                assignments.append(f"{name} = json_set(COALESCE({name}, '{{}}'), {pairs})")
+                for k, v in values.items():
+                    parameters += (_json_key(k), json.dumps(v))
+        if not assignments:
+            return
+
+        with self.pool.writer() as connection:
+            connection.execute(
+                f"UPDATE content SET {', '.join(assignments)} WHERE id = ?",
+                parameters + (id,),
             )
+        if self.manifests:
+            self.manifests.invalidate()
 
     def query(
         self,
@@ -189,34 +525,38 @@ class ContentDb:
         source_id: Optional[str] = None,
         stream_id: Optional[int] = None,
         pipeline_id: Optional[int] = None,
-        created_after: Optional[str] = None,
-        created_before: Optional[str] = None,
+        created_after: Optional[Union[str, datetime]] = None,
+        created_before: Optional[Union[str, datetime]] = None,
         orientation: Optional[str] = None,
+        ids: Optional[List[str]] = None,
+        after: Optional[ContentCursor] = None,
+        search: Optional[str] = None,
     ) -> List[Content]:
-        conditionals = [
-            x
-            for x in [
-                ("source_id == ?", source_id),
-                ("stream_id == ?", stream_id),
-                ("pipeline_id == ?", pipeline_id),
-                ("datetime(created_at) > datetime(?)", created_after),
-                ("datetime(created_at) < datetime(?)", created_before),
-                ("json_extract(metadata, '$.orientation') == ?", orientation),
-            ]
-            if x[1]
-        ]
+        """Queries for content. Newer content appears at the top of the list.
 
-        where_clause = " AND ".join([c[0] for c in conditionals])
-        parameters = tuple([c[1] for c in conditionals])
-
-        query = "SELECT * FROM content "
-        if len(conditionals):
-            query += "WHERE " + where_clause
-        query += " ORDER BY created_at DESC LIMIT ?"
-        parameters += (limit,)
+        Args:
+            limit (int): Return at most this many items.
+            created_after (Optional[Union[str, datetime]]): Only return content created after this time (a datetime or iso format string).
+            created_before (Optional[Union[str, datetime]]): Only return content created before this time (a datetime or iso format string).
+            after (Optional[ContentCursor]): Use for pagination -- only return content that comes after this position in the results.
+            search (Optional[str]): Only return content with metadata containing all of these words (i.e., a filename or camera model).
 
-        with self.connection:
-            results = self.connection.execute(query, parameters).fetchall()
+        Returns:
+            List[Content]: The content found.
+        """
+        results = self._select(
+            _CONTENT_COLUMNS,
+            limit,
+            source_id=source_id,
+            stream_id=stream_id,
+            pipeline_id=pipeline_id,
+            created_after=created_after,
+            created_before=created_before,
+            orientation=orientation,
+            ids=ids,
+            after=after,
+            search=search,
+        )
         return [
             Content(
                 id=id,
@@ -229,6 +569,7 @@ class ContentDb:
                 stream_id=stream_id,
                 versions={k: v for k, v in json.loads(versions).items()},
                 poster=poster,
+                video_info=_video_info_of(duration, fps, codec, bytes, has_audio, frames),
             )
             for (
                 id,
@@ -242,26 +583,235 @@ class ContentDb:
                 width,
                 versions,
                 poster,
+                duration,
+                fps,
+                codec,
+                bytes,
+                has_audio,
+                frames,
             ) in results
         ]
 
+    def _select(
+        self,
+        columns: str,
+        limit: int,
+        source_id: Optional[str] = None,
+        stream_id: Optional[int] = None,
+        pipeline_id: Optional[int] = None,
+        created_after: Optional[Union[str, datetime]] = None,
+        created_before: Optional[Union[str, datetime]] = None,
+        orientation: Optional[str] = None,
+        ids: Optional[List[str]] = None,
+        after: Optional[ContentCursor] = None,
+        search: Optional[str] = None,
+        offset: int = 0,
+    ) -> List[tuple]:
+        # A source id matches a row or two, but sqlite would rather use an index that is already sorted by created_at.
+        # When filtering by source, the unary + keeps sqlite from using the stream, pipeline, and orientation indexes.
+        other = "+" if source_id else ""
+        conditionals = [
+            x
+            for x in [
+                ("source_id == ?", source_id),
+                (f"{other}stream_id == ?", stream_id),
+                (f"{other}pipeline_id == ?", pipeline_id),
+                # Columns are compared directly (not through functions) so that sqlite can use the indexes on them.
+                ("created_at > ?", _timestamp_parameter(created_after)),
+                ("created_at < ?", _timestamp_parameter(created_before)),
+                (f"{other}orientation == ?", orientation),
+            ]
+            if x[1]
+        ]
+
+        where_clauses = [c[0] for c in conditionals]
+        parameters = tuple([c[1] for c in conditionals])
+        if ids is not None:
+            where_clauses.append(f"id IN ({', '.join('?' * len(ids))})")
+            parameters += tuple(ids)
+        if after is not None:
+            where_clauses.append("(created_at, id) < (?, ?)")
+            parameters += (after.created_at, after.id)
+        if search and search.strip():
+            where_clauses.append("rowid IN (SELECT rowid FROM content_search WHERE content_search MATCH ?)")
+            parameters += (_search_query(search),)
+
+        query = f"SELECT {columns} FROM content "
+        if len(where_clauses):
+            query += "WHERE " + " AND ".join(where_clauses)
+        # id breaks ties between content created at the same time so pages never skip or repeat items.
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        parameters += (limit,)
+        if offset:
+            query += " OFFSET ?"
+            parameters += (offset,)
+
+        with self.pool.reader() as connection:
+            return connection.execute(query, parameters).fetchall()
+
+    def exceeds(self, limit: int, **kwargs) -> bool:
+        """Returns whether more than `limit` content matches a query. Takes the same parameters as `query`."""
+        return len(self._select("1", 1, offset=limit, **kwargs)) > 0
+
+    def ids_and_versions(self, limit: int, **kwargs) -> List[ContentRow]:
+        """Queries for lightweight rows holding only what lists of content (i.e., playlists) need.
+        Takes the same parameters as `query`, and is much cheaper for large results.
+
+        Returns:
+            List[ContentRow]: The content found, newest first.
+        """
+        return [
+            ContentRow(id, created_at, duration, versions)
+            for id, created_at, duration, versions in self._select(
+                "id, created_at, duration, versions", limit, **kwargs
+            )
+        ]
+
+    def iterate(
+        self, page_size: int, limit: Optional[int] = None, rows: bool = False, **kwargs
+    ) -> Iterator[Union[Content, ContentRow]]:
+        """Iterates over content matching a query, reading it from the database a page at a time.
+
+        Args:
+            page_size (int): How many items to read at once.
+            limit (Optional[int]): If set, stop after this many items.
+            rows (bool): If True, yield lightweight ContentRows (see `ids_and_versions`) instead of Content.
+            **kwargs: Query parameters passed to `query`.
+
+        Yields:
+            Union[Content, ContentRow]: The content found, newest first.
+        """
+        fetch = self.ids_and_versions if rows else self.query
+        after = kwargs.pop("after", None)
+        remaining = limit if limit else sys.maxsize
+        while remaining > 0:
+            page = fetch(min(page_size, remaining), after=after, **kwargs)
+            yield from page
+            if len(page) < page_size:
+                break
+            remaining -= len(page)
+            after = ContentCursor.of(page[-1])
+
+    def seen_sources(self, stream_id: int, pipeline_id: Optional[int] = None) -> Set[str]:
+        """Lists the media of a stream that content was created from.
+
+        Args:
+            stream_id (int): The stream the media came from.
+            pipeline_id (Optional[int]): If set, only content created by this pipeline is considered.
+
+        Returns:
+            Set[str]: The source_id of each piece of content.
+        """
+        query = "SELECT source_id FROM content WHERE stream_id = ?"
+        parameters = (stream_id,)
+        if pipeline_id:
+            query += " AND pipeline_id = ?"
+            parameters += (pipeline_id,)
+        with self.pool.reader() as connection:
+            return set(r[0] for r in connection.execute(query, parameters).fetchall())
+
+    def find_by_object(
+        self, object_hash: str, version: Optional[str] = None
+    ) -> List[Tuple[str, str]]:
+        """Finds the content that uses an object from the object store as one of its versions.
+
+        Args:
+            object_hash (str): The hash of the object.
+            version (Optional[str]): If set, only match this version (i.e., faded).
+
+        Returns:
+            List[Tuple[str, str]]: The (content_id, version) of each use of the object.
+        """
+        query = "SELECT content_id, version FROM content_versions WHERE object_hash = ?"
+        parameters = (object_hash,)
+        if version:
+            query += " AND version = ?"
+            parameters += (version,)
+        with self.pool.reader() as connection:
+            return connection.execute(query, parameters).fetchall()
+
+    def missing_video_info(self) -> List[str]:
+        """Lists the ids of content whose video info is incomplete and that probe-videos hasn't tried yet
+        (see ContentApi.probe and record_probe)."""
+        with self.pool.reader() as connection:
+            return [
+                r[0]
+                for r in connection.execute(
+                    "SELECT id FROM content WHERE (fps IS NULL OR frames IS NULL) AND id NOT IN (SELECT content_id FROM video_probes)"
+                ).fetchall()
+            ]
+
+    def record_probe(self, id: str, info: Optional[VideoInfo]) -> None:
+        """Saves the result of probing content's video, and records the attempt so it isn't probed again.
+
+        Args:
+            id (str): The content that was probed.
+            info (Optional[VideoInfo]): What was found, or None if the video couldn't be probed.
+        """
+        if info:
+            self.update_fields(id, **info.to_dict())
+        with self.pool.writer() as connection:
+            connection.execute(
+                "REPLACE INTO video_probes (content_id, probed_at, succeeded) VALUES(?, ?, ?)",
+                (id, datetime.now(), info is not None),
+            )
+
+    def latest_change(self) -> int:
+        """Returns the sequence number of the most recent change to the content table (0 if there are none)."""
+        with self.pool.reader() as connection:
+            return connection.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM content_changes"
+            ).fetchone()[0]
 
-class FramesDb:
-    def __init__(self, connection: sqlite3.Connection):
-        self.connection = connection
+    def changed_since(self, seq: int) -> Tuple[int, Optional[List[str]]]:
+        """Lists the content that was added, updated, or removed after a point in the change log.
+        Only the most recent changes are kept (see 017_content_changes_pruning.sql).
+
+        Args:
+            seq (int): Only consider changes with a sequence number greater than this.
+
+        Returns:
+            Tuple[int, Optional[List[str]]]: The sequence number of the latest change, and the ids of the content that
+                changed -- or None if some of the changes after seq were pruned.
+        """
+        with self.pool.reader() as connection:
+            latest, earliest = connection.execute(
+                # Separate sub-queries so sqlite can read each end of the primary key instead of scanning.
+                "SELECT COALESCE((SELECT MAX(seq) FROM content_changes), 0), (SELECT MIN(seq) FROM content_changes)"
+            ).fetchone()
+            if earliest is not None and seq < earliest - 1:
+                return latest, None
+            ids = [
+                r[0]
+                for r in connection.execute(
+                    "SELECT DISTINCT content_id FROM content_changes WHERE seq > ? AND seq <= ?",
+                    (seq, latest),
+                ).fetchall()
+            ]
+        return latest, ids
+
+
+class FramesDb(_Db):
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        manifests: Optional[FrameManifestCache] = None,
+    ):
+        super().__init__(pool)
+        self.manifests = manifests
 
     def list(self) -> pd.DataFrame:
         """
         Lists all frames in the datastore.
         """
-        with self.connection:
+        with self.pool.reader() as connection:
             return pd.read_sql_query(
-                "SELECT * FROM frames", self.connection, index_col="id"
+                "SELECT * FROM frames", connection, index_col="id"
             )
 
     def get(self, id: str) -> Frame:
-        with self.connection:
-            res = self.connection.execute(
+        with self.pool.reader() as connection:
+            res = connection.execute(
                 "SELECT * FROM frames WHERE id = ?", (id,)
             ).fetchone()
             if res:
@@ -271,8 +821,8 @@ class FramesDb:
                 return None
     
     def search(self) -> List[Frame]:
-        with self.connection:
-            res = self.connection.execute(
+        with self.pool.reader() as connection:
+            res = connection.execute(
                 "SELECT * FROM frames"
             ).fetchall()
             if res:
@@ -287,15 +837,17 @@ class FramesDb:
         """
         Removes a frame from the datastore.
         """
-        with self.connection:
-            self.connection.execute("DELETE FROM frames WHERE id = ?", (id,))
+        with self.pool.writer() as connection:
+            connection.execute("DELETE FROM frames WHERE id = ?", (id,))
+        if self.manifests:
+            self.manifests.invalidate(id)
 
     def add(self, id: str, name: str, **options) -> Frame:
         """
         Saves a new frame to the datastore.
         """
-        with self.connection:
-            self.connection.execute(
+        with self.pool.writer() as connection:
+            connection.execute(
                 "INSERT INTO frames(id, name, options) VALUES(?, ?, ?)",
                 (id, name, json.dumps(options)),
             )
@@ -305,56 +857,65 @@ class FramesDb:
         """
         Updates an existing frame in the datastore.
         """
-        with self.connection:
+        with self.pool.writer() as connection:
             if name:
-                self.connection.execute(
+                connection.execute(
                     "UPDATE frames SET name = ? WHERE id = ?", (name, id)
                 )
             if options:
-                self.connection.execute(
+                connection.execute(
                     "UPDATE frames SET options = ? WHERE id = ?",
                     (json.dumps(options), id),
                 )
+        if self.manifests:
+            self.manifests.invalidate(id)
 
 
-class PipelineDb:
-    def __init__(self, connection: sqlite3.Connection):
-        self.connection = connection
-
+class PipelineDb(_Db):
     def list(self) -> pd.DataFrame:
         """
         Lists all pipelines in the datastore.
         """
-        with self.connection:
+        with self.pool.reader() as connection:
             return pd.read_sql_query(
-                "SELECT * FROM pipelines", self.connection, index_col="id"
+                "SELECT * FROM pipelines", connection, index_col="id"
             )
 
     def list_runs(self) -> pd.DataFrame:
         """
         Lists all pipeline runs in the datastore.
         """
-        with self.connection:
+        with self.pool.reader() as connection:
             return pd.read_sql_query(
-                "SELECT * FROM pipeline_runs", self.connection, index_col="id"
+                "SELECT * FROM pipeline_runs", connection, index_col="id"
             )
 
-    def get(self, pipeline_id: int) -> Optional[Tuple[int, int, str, List[Step]]]:
-        with self.connection:
-            res = self.connection.execute(
-                "SELECT * FROM pipelines WHERE id = ?", (pipeline_id,)
+    def get(self, pipeline_id: int) -> Optional[Tuple[int, int, str, List[Step], Dict[str, Any]]]:
+        with self.pool.reader() as connection:
+            res = connection.execute(
+                "SELECT id, stream_id, name, options FROM pipelines WHERE id = ?", (pipeline_id,)
             ).fetchone()
         if res:
-            id, stream_id, name = res
-            return (id, stream_id, name, self.get_steps(pipeline_id))
+            id, stream_id, name, options = res
+            return (id, stream_id, name, self.get_steps(pipeline_id), json.loads(options))
         else:
             return None
 
+    def set_options(self, pipeline_id: int, **options) -> None:
+        """
+        Sets some of a pipeline's options, keeping the others. Options set to None are removed.
+        """
+        with self.pool.writer() as connection:
+            connection.execute(
+                "UPDATE pipelines SET options = json_patch(options, ?) WHERE id = ?",
+                (json.dumps(options), pipeline_id),
+            )
+
     def get_steps(self, pipeline_id: int) -> List[Step]:
-        with self.connection:
+        with self.pool.reader() as connection:
             return [
                 s[0]
-                for s in self.connection.execute(
+                for s in connection.execute(
                     "SELECT step FROM pipeline_steps WHERE pipeline_id = ? ORDER BY id ASC",
                     (pipeline_id,),
                 ).fetchall()
@@ -364,8 +925,8 @@ class PipelineDb:
         """
         Creates a new pipeline
         """
-        with self.connection:
-            cursor = self.connection.cursor()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
             cursor.execute(
                 "INSERT INTO pipelines(name, stream_id) VALUES(?, ?)",
                 (name, stream_id),
@@ -376,8 +937,8 @@ class PipelineDb:
         """
         Adds a step to a pipeline.
         """
-        with self.connection:
-            cursor = self.connection.cursor()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
             cursor.execute(
                 "INSERT INTO pipeline_steps(pipeline_id, step) VALUES(?, ?)",
                 (pipeline_id, step),
@@ -412,7 +973,7 @@ class PipelineDb:
             if x[1]
         ]
 
-        query = "SELECT * FROM pipeline_runs"
+        query = "SELECT * FROM pipeline_runs "
         if len(conditionals):
             query += "WHERE " + (" AND ".join([c[0] for c in conditionals]))
         query += " ORDER BY id DESC"
@@ -421,23 +982,78 @@ class PipelineDb:
             query += " LIMIT ?"
             parameters += (limit,)
 
-        with self.connection:
-            results = self.connection.execute(query, parameters).fetchall()
+        with self.pool.reader() as connection:
+            results = connection.execute(query, parameters).fetchall()
             if results:
                 return [PipelineRun(*r) for r in results]
             else:
                 return None
 
     def get_run(self, run_id: int) -> PipelineRun:
-        result = self.connection.execute(
-            "SELECT * FROM pipeline_runs WHERE id=?",
-            (run_id,),
-        ).fetchone()
+        with self.pool.reader() as connection:
+            result = connection.execute(
+                "SELECT * FROM pipeline_runs WHERE id=?",
+                (run_id,),
+            ).fetchone()
         return PipelineRun(*result) if result else None
 
+    def get_checkpoint(self, pipeline_id: int, stream_id: int) -> Optional[Dict[str, Any]]:
+        """Returns where the pipeline's latest run got to in the stream, or None if there's no checkpoint for the stream."""
+        with self.pool.reader() as connection:
+            res = connection.execute(
+                "SELECT checkpoint FROM pipeline_checkpoints WHERE pipeline_id = ? AND stream_id = ?",
+                (pipeline_id, stream_id),
+            ).fetchone()
+        return json.loads(res[0]) if res else None
+
+    def save_checkpoint(
+        self,
+        pipeline_id: int,
+        stream_id: int,
+        checkpoint: Dict[str, Any],
+        last_identifier: Optional[str],
+    ) -> None:
+        """Records where a pipeline's run has got to in its stream (see Stream.checkpoint)."""
+        with self.pool.writer() as connection:
+            connection.execute(
+                "REPLACE INTO pipeline_checkpoints (pipeline_id, stream_id, checkpoint, last_identifier, updated_at) VALUES(?, ?, ?, ?, ?)",
+                (pipeline_id, stream_id, json.dumps(checkpoint), last_identifier, datetime.now()),
+            )
+
+    def clear_checkpoint(self, pipeline_id: int) -> None:
+        """Removes a pipeline's checkpoint, so that the next run starts from the beginning of the stream."""
+        with self.pool.writer() as connection:
+            connection.execute(
+                "DELETE FROM pipeline_checkpoints WHERE pipeline_id = ?", (pipeline_id,)
+            )
+
+    def get_high_water_mark(self, pipeline_id: int, stream_id: int) -> Optional[datetime]:
+        """Returns when the newest media the pipeline processed from the stream was created (in utc), if any."""
+        with self.pool.reader() as connection:
+            res = connection.execute(
+                "SELECT created_at FROM pipeline_high_water_marks WHERE pipeline_id = ? AND stream_id = ?",
+                (pipeline_id, stream_id),
+            ).fetchone()
+        return res[0] if res else None
+
+    def advance_high_water_mark(self, pipeline_id: int, stream_id: int, created_at: datetime) -> None:
+        """Records that the pipeline has processed the stream's media up to created_at. The mark never moves backwards."""
+        with self.pool.writer() as connection:
+            connection.execute(
+                """INSERT INTO pipeline_high_water_marks (pipeline_id, stream_id, created_at, updated_at) VALUES(?, ?, ?, ?)
+                ON CONFLICT (pipeline_id) DO UPDATE SET
+                    created_at = CASE
+                        WHEN stream_id != excluded.stream_id OR created_at < excluded.created_at THEN excluded.created_at
+                        ELSE created_at
+                    END,
+                    stream_id = excluded.stream_id,
+                    updated_at = excluded.updated_at""",
+                (pipeline_id, stream_id, _timestamp_parameter(created_at), datetime.now()),
+            )
+
     def add_run(self, run: PipelineRun) -> int:
-        with self.connection:
-            cursor = self.connection.cursor()
+        with self.pool.writer() as connection:
+            cursor = connection.cursor()
             cursor.execute(
                 "INSERT INTO pipeline_runs(pipeline_id, log_hash, status, completed_at) VALUES(?, ?, ?, ?)",
                 (run.pipeline_id, run.log_hash, run.status, run.completed_at),
@@ -445,17 +1061,34 @@ class PipelineDb:
             return cursor.lastrowid
 
 
-class UploadsDb:
-    def __init__(self, connection: sqlite3.Connection):
-        self.connection = connection
+def _upload_row(u: Upload) -> tuple:
+    # sqllite3 throws when reading back a timestamp with timezone info
+    # (see https://stackoverflow.com/questions/48614488/python-sqlite-valueerror-invalid-literal-for-int-with-base-10-b5911)
+    # Just check that the values passed don't have timezone info
+    if u.created_at.tzinfo is not None:
+        raise Exception(
+            f"Due to an sqlite bug, created_at must have no timezone"
+        )
+    if u.uploaded_at.tzinfo is not None:
+        raise Exception(
+            f"Due to an sqlite bug, uploaded_at must have no timezone"
+        )
+    metadata = json.dumps(u.metadata) if u.metadata is not None else None
+    return (u.id, u.created_at, u.uploaded_at, metadata, u.content_type)
+
+
+class UploadsDb(_Db):
+    def __init__(self, pool: ConnectionPool, batch_size: Optional[int] = None):
+        super().__init__(pool)
+        self.batch_size = batch_size if batch_size else DEFAULT_BATCH_SIZE
 
     def list(self) -> pd.DataFrame:
         """
         Lists all uploads in the datastore.
         """
-        with self.connection:
+        with self.pool.reader() as connection:
             return pd.read_sql_query(
-                "SELECT * FROM uploads", self.connection, index_col="id"
+                "SELECT * FROM uploads", connection, index_col="id"
             )
 
     def get(self, id: str) -> Optional[Upload]:
@@ -477,8 +1110,8 @@ class UploadsDb:
         """
         Removes an upload from the datastore.
         """
-        with self.connection:
-            self.connection.execute("DELETE FROM uploads WHERE id = ?", (id,))
+        with self.pool.writer() as connection:
+            connection.execute("DELETE FROM uploads WHERE id = ?", (id,))
 
     def save(self, u: Upload):
         """Stores a new upload in the database
@@ -486,39 +1119,54 @@ class UploadsDb:
         Args:
             u (Upload): The upload to store
         """
-        metadata = u.metadata
-        if u.metadata:
-            metadata = json.dumps(u.metadata)
-        with self.connection:
-            # sqllite3 throws when reading back a timestamp with timezone info
-            # (see https://stackoverflow.com/questions/48614488/python-sqlite-valueerror-invalid-literal-for-int-with-base-10-b5911)
-            # Just check that the values passed don't have timezone info
-            if u.created_at.tzinfo is not None:
-                raise Exception(
-                    f"Due to an sqlite bug, created_at must have no timezone"
-                )
-            if u.uploaded_at.tzinfo is not None:
-                raise Exception(
-                    f"Due to an sqlite bug, uploaded_at must have no timezone"
+        self.save_many([u])
+
+    def save_many(self, uploads: Iterable[Upload], batch_size: Optional[int] = None) -> int:
+        """Stores uploads in batches, committing once per batch.
+
+        Args:
+            uploads (Iterable[Upload]): The uploads to store.
+            batch_size (Optional[int]): How many uploads are committed at once. Defaults to this database's batch_size.
+
+        Returns:
+            int: How many uploads were stored.
+        """
+        count = 0
+        for batch in _batches(uploads, batch_size if batch_size else self.batch_size):
+            rows = [_upload_row(u) for u in batch]
+            with self.pool.writer() as connection:
+                # An upsert rather than REPLACE INTO, which deletes the old row without firing the search index's triggers.
+                connection.executemany(
+                    "INSERT INTO uploads (id, created_at, uploaded_at, metadata, content_type) VALUES(?, ?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET created_at = excluded.created_at, uploaded_at = excluded.uploaded_at, "
+                    "metadata = excluded.metadata, content_type = excluded.content_type",
+                    rows,
                 )
-            self.connection.execute(
-                "REPLACE INTO uploads (id, created_at, uploaded_at, metadata, content_type) VALUES(?, ?, ?, ?, ?)",
-                (u.id, u.created_at, u.uploaded_at, metadata, u.content_type),
-            )
+            count += len(rows)
+        return count
+
+    def batch(self) -> BatchWriter[Upload]:
+        """Returns a BatchWriter that saves uploads through save_many."""
+        return BatchWriter(self.save_many, self.batch_size)
 
     def query(
         self,
         limit: int,
-        created_after: Optional[str] = None,
-        created_before: Optional[str] = None,
-        uploaded_after: Optional[str] = None,
-        uploaded_before: Optional[str] = None,
+        created_after: Optional[Union[str, datetime]] = None,
+        created_before: Optional[Union[str, datetime]] = None,
+        uploaded_after: Optional[Union[str, datetime]] = None,
+        uploaded_before: Optional[Union[str, datetime]] = None,
         id: Optional[str] = None,
+        search: Optional[str] = None,
+        after: Optional[Tuple[datetime, str]] = None,
     ) -> List[Upload]:
-        """Queries for uploads from the database.
+        """Queries for uploads from the database. Newer uploads appear at the top of the list.
 
         Args:
             limit (int): Return at most this many uploads.
+            created_after (Optional[Union[str, datetime]]): Only return uploads created after this time (a datetime or iso format string).
+            search (Optional[str]): Only return uploads with metadata containing all of these words (i.e., a filename or camera model).
+            after (Optional[Tuple[datetime, str]]): Use for pagination -- only return uploads after this (created_at, id) in the results.
 
         Returns:
             List[Upload]: Any uploads that were found.
@@ -526,26 +1174,34 @@ class UploadsDb:
         conditionals = [
             x
             for x in [
-                ("id == ", id),
-                ("created_at > ?", created_after),
-                ("created_at < ?", created_before),
-                ("uploaded_at > ?", uploaded_after),
-                ("uploaded_at < ?", uploaded_before),
+                ("id == ?", id),
+                ("created_at > ?", _timestamp_parameter(created_after)),
+                ("created_at < ?", _timestamp_parameter(created_before)),
+                ("uploaded_at > ?", _timestamp_parameter(uploaded_after)),
+                ("uploaded_at < ?", _timestamp_parameter(uploaded_before)),
+                (
+                    "rowid IN (SELECT rowid FROM uploads_search WHERE uploads_search MATCH ?)",
+                    _search_query(search) if search else None,
+                ),
             ]
             if x[1]
         ]
 
-        where_clause = " AND ".join([c[0] for c in conditionals])
+        where_clauses = [c[0] for c in conditionals]
         parameters = tuple([c[1] for c in conditionals])
+        if after is not None:
+            where_clauses.append("(created_at, id) < (?, ?)")
+            parameters += tuple(after)
 
         query = "SELECT * FROM uploads "
-        if len(conditionals):
-            query += "WHERE " + where_clause
-        query += " ORDER BY created_at DESC LIMIT ?"
+        if len(where_clauses):
+            query += "WHERE " + " AND ".join(where_clauses)
+        # id breaks ties between uploads created at the same time so pages never skip or repeat items.
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
         parameters += (limit,)
 
-        with self.connection:
-            results = self.connection.execute(query, parameters).fetchall()
+        with self.pool.reader() as connection:
+            results = connection.execute(query, parameters).fetchall()
         return [
             Upload(
                 id=id,
@@ -558,23 +1214,20 @@ class UploadsDb:
         ]
 
 
-class AuxiliaryCacheDb:
-    def __init__(self, connection: sqlite3.Connection):
-        self.connection = connection
-
+class AuxiliaryCacheDb(_Db):
     def get(self, id: str, type: str) -> Optional[AuxiliaryData]:
         """
         Gets auxiliary data from the data store
         """
-        with self.connection:
-            res = self.connection.execute(
+        with self.pool.reader() as connection:
+            res = connection.execute(
                 "SELECT * FROM auxiliary_cache WHERE id = ? AND type = ?", (id, type)
             ).fetchone()
         return AuxiliaryData(*res) if res else None
 
     def save(self, d: AuxiliaryData):
         """Stores a depth image in the database"""
-        with self.connection:
+        with self.pool.writer() as connection:
             # sqllite3 throws when reading back a timestamp with timezone info
             # (see https://stackoverflow.com/questions/48614488/python-sqlite-valueerror-invalid-literal-for-int-with-base-10-b5911)
             # Just check that the values passed don't have timezone info
@@ -582,18 +1235,23 @@ class AuxiliaryCacheDb:
                 raise Exception(
                     f"Due to an sqlite bug, computed_at must have no timezone"
                 )
-            self.connection.execute(
+            connection.execute(
                 "REPLACE INTO auxiliary_cache (id, computed_at, type, file_hash) VALUES(?, ?, ?, ?)",
                 (d.id, d.computed_at, d.type, d.file_hash),
             )
 
 
-class PreRenderDb:
-    def __init__(self, connection: sqlite3.Connection):
-        self.connection = connection
+class PreRenderDb(_Db):
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        manifests: Optional[FrameManifestCache] = None,
+    ):
+        super().__init__(pool)
+        self.manifests = manifests
 
     def get_for_frame(self, frame_id: str, limit: int) -> List[PreRender]:
-        with self.connection:
+        with self.pool.reader() as connection:
             return [
                 PreRender(
                     id=id,
@@ -608,7 +1266,7 @@ class PreRenderDb:
                     created_at,
                     video_hash,
                     video_ids,
-                ) in self.connection.execute(
+                ) in connection.execute(
                     "SELECT * FROM pre_renders WHERE frame_id = ? ORDER BY created_at DESC limit ?",
                     (frame_id, limit),
                 ).fetchall()
@@ -616,15 +1274,20 @@ class PreRenderDb:
 
     def create(self, frame_id: str, video_hash: str, video_ids: List[str]) -> PreRender:
         """Stores a depth image in the database"""
-        with self.connection:
-            self.connection.execute(
+        with self.pool.writer() as connection:
+            connection.execute(
                 "INSERT INTO pre_renders (frame_id, created_at, video_hash, video_ids) VALUES(?, ?, ?, ?)",
                 (frame_id, datetime.now(), video_hash, json.dumps(video_ids)),
             )
-            return self.get_for_frame(frame_id, 1)[0]
+        if self.manifests:
+            self.manifests.invalidate(frame_id)
+        return self.get_for_frame(frame_id, 1)[0]
 
     def delete(self, id: int) -> None:
-        with self.connection:
-            self.connection.execute(
+        with self.pool.writer() as connection:
+            connection.execute(
                 "DELETE FROM pre_renders WHERE id = ?", (id,)
-            )
\ No newline at end of file
+            )
+        # The frame may have been serving this pre-render.
+        if self.manifests:
+            self.manifests.invalidate()
\ No newline at end of file
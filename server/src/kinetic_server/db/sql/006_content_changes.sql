@@ -0,0 +1,20 @@
+-- A log of changes to the content table. Frames use it to sync incrementally.
+CREATE TABLE content_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    -- increases with every change
+    content_id TEXT NOT NULL,
+    -- the content that changed
+    change TEXT NOT NULL -- one of added, updated, or removed
+);
+
+CREATE TRIGGER content_changes_insert_trigger AFTER INSERT ON content BEGIN
+    INSERT INTO content_changes (content_id, change) VALUES (new.id, 'added');
+END;
+
+CREATE TRIGGER content_changes_update_trigger AFTER UPDATE ON content BEGIN
+    INSERT INTO content_changes (content_id, change) VALUES (new.id, 'updated');
+END;
+
+CREATE TRIGGER content_changes_delete_trigger AFTER DELETE ON content BEGIN
+    INSERT INTO content_changes (content_id, change) VALUES (old.id, 'removed');
+END;
@@ -0,0 +1,4 @@
+-- Content is paginated on (created_at, id). This index replaces the one on created_at alone.
+DROP INDEX content_created_at_idx;
+
+CREATE INDEX content_created_at_id_idx ON content (created_at, id);
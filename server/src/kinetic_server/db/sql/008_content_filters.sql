@@ -0,0 +1,14 @@
+-- Frames and the gallery filter content by orientation, stream, or pipeline and page through it newest first.
+-- orientation is copied out of the metadata json into a generated column so that it can be indexed.
+ALTER TABLE content ADD COLUMN orientation TEXT GENERATED ALWAYS AS (json_extract(metadata, '$.orientation')) VIRTUAL;
+
+CREATE INDEX content_orientation_created_at_id_idx ON content (orientation, created_at, id);
+
+-- These replace the indexes on stream_id and pipeline_id alone.
+DROP INDEX content_stream_id_idx;
+
+CREATE INDEX content_stream_id_created_at_id_idx ON content (stream_id, created_at, id);
+
+DROP INDEX content_pipeline_id_idx;
+
+CREATE INDEX content_pipeline_id_created_at_id_idx ON content (pipeline_id, created_at, id);
@@ -0,0 +1,15 @@
+-- Indexes found missing by `kinetic-cli database check-plans`.
+-- The latest pre-renders of a frame. This replaces the index on frame_id alone.
+DROP INDEX pre_redener_frame_id_idx;
+
+CREATE INDEX pre_renders_frame_id_created_at_idx ON pre_renders (frame_id, created_at);
+
+CREATE INDEX pipeline_steps_pipeline_id_idx ON pipeline_steps (pipeline_id);
+
+-- Runs are listed newest (highest id) first, per pipeline or by status.
+-- These replace the index on (pipeline_id, completed_at), which no query sorts by.
+DROP INDEX pipleine_recent_runs_idx;
+
+CREATE INDEX pipeline_runs_pipeline_id_id_idx ON pipeline_runs (pipeline_id, id);
+
+CREATE INDEX pipeline_runs_status_id_idx ON pipeline_runs (status, id);
@@ -0,0 +1,31 @@
+-- Each version of each piece of content, so content can be found by the objects it uses (i.e., which content is this video?).
+-- content.versions stays the source of truth. The triggers below keep this table in sync with it.
+CREATE TABLE content_versions (
+    content_id TEXT NOT NULL,
+    -- the content this version belongs to
+    version TEXT NOT NULL,
+    -- i.e., original or faded
+    object_hash TEXT NOT NULL,
+    -- the object in the object store
+    PRIMARY KEY (content_id, version)
+) WITHOUT ROWID;
+
+CREATE INDEX content_versions_object_hash_idx ON content_versions (object_hash);
+
+INSERT INTO content_versions (content_id, version, object_hash)
+SELECT content.id, versions.key, versions.value FROM content, json_each(content.versions) AS versions;
+
+CREATE TRIGGER content_versions_insert_trigger AFTER INSERT ON content BEGIN
+    INSERT INTO content_versions (content_id, version, object_hash)
+    SELECT new.id, key, value FROM json_each(new.versions);
+END;
+
+CREATE TRIGGER content_versions_update_trigger AFTER UPDATE OF versions ON content BEGIN
+    DELETE FROM content_versions WHERE content_id = old.id;
+    INSERT INTO content_versions (content_id, version, object_hash)
+    SELECT new.id, key, value FROM json_each(new.versions);
+END;
+
+CREATE TRIGGER content_versions_delete_trigger AFTER DELETE ON content BEGIN
+    DELETE FROM content_versions WHERE content_id = old.id;
+END;
@@ -0,0 +1,13 @@
+-- Facts about each piece of content's original video, so playlists and renders don't have to parse metadata or probe files.
+ALTER TABLE content ADD COLUMN duration REAL;
+-- seconds
+ALTER TABLE content ADD COLUMN fps REAL;
+
+ALTER TABLE content ADD COLUMN codec TEXT;
+
+ALTER TABLE content ADD COLUMN bytes INTEGER;
+
+ALTER TABLE content ADD COLUMN has_audio INTEGER;
+
+-- The duration is already known for faded content. The rest is filled in by `kinetic-cli database probe-videos`.
+UPDATE content SET duration = json_extract(metadata, '$.duration') WHERE json_type(metadata, '$.duration') IN ('integer', 'real');
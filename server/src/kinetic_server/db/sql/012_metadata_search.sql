@@ -0,0 +1,41 @@
+-- Full text indexes over the values in content and upload metadata (i.e., filenames, camera models, album names).
+-- Each row's rowid is the rowid of the content or upload it indexes, so the triggers can update it without a scan.
+CREATE VIRTUAL TABLE content_search USING fts5(text);
+
+CREATE VIRTUAL TABLE uploads_search USING fts5(text);
+
+INSERT INTO content_search (rowid, text)
+SELECT content.rowid, (SELECT group_concat(atom, ' ') FROM json_tree(content.metadata) WHERE atom IS NOT NULL) FROM content;
+
+INSERT INTO uploads_search (rowid, text)
+SELECT uploads.rowid, (SELECT group_concat(atom, ' ') FROM json_tree(uploads.metadata) WHERE atom IS NOT NULL) FROM uploads;
+
+CREATE TRIGGER content_search_insert_trigger AFTER INSERT ON content BEGIN
+    INSERT INTO content_search (rowid, text)
+    VALUES (new.rowid, (SELECT group_concat(atom, ' ') FROM json_tree(new.metadata) WHERE atom IS NOT NULL));
+END;
+
+CREATE TRIGGER content_search_update_trigger AFTER UPDATE OF metadata ON content BEGIN
+    DELETE FROM content_search WHERE rowid = old.rowid;
+    INSERT INTO content_search (rowid, text)
+    VALUES (new.rowid, (SELECT group_concat(atom, ' ') FROM json_tree(new.metadata) WHERE atom IS NOT NULL));
+END;
+
+CREATE TRIGGER content_search_delete_trigger AFTER DELETE ON content BEGIN
+    DELETE FROM content_search WHERE rowid = old.rowid;
+END;
+
+CREATE TRIGGER uploads_search_insert_trigger AFTER INSERT ON uploads BEGIN
+    INSERT INTO uploads_search (rowid, text)
+    VALUES (new.rowid, (SELECT group_concat(atom, ' ') FROM json_tree(new.metadata) WHERE atom IS NOT NULL));
+END;
+
+CREATE TRIGGER uploads_search_update_trigger AFTER UPDATE OF metadata ON uploads BEGIN
+    DELETE FROM uploads_search WHERE rowid = old.rowid;
+    INSERT INTO uploads_search (rowid, text)
+    VALUES (new.rowid, (SELECT group_concat(atom, ' ') FROM json_tree(new.metadata) WHERE atom IS NOT NULL));
+END;
+
+CREATE TRIGGER uploads_search_delete_trigger AFTER DELETE ON uploads BEGIN
+    DELETE FROM uploads_search WHERE rowid = old.rowid;
+END;
@@ -0,0 +1,2 @@
+-- A json map of options for running a pipeline (i.e., how many media to process at once).
+ALTER TABLE pipelines ADD COLUMN options TEXT NOT NULL DEFAULT '{}';
@@ -0,0 +1,17 @@
+-- How far each pipeline's latest run got through its stream, so an interrupted run can be resumed.
+CREATE TABLE pipeline_checkpoints (
+    pipeline_id INTEGER PRIMARY KEY,
+    stream_id INTEGER NOT NULL,
+    -- the stream the checkpoint is a position in
+    checkpoint TEXT NOT NULL,
+    -- a json object the stream resumes from (i.e., a page token)
+    last_identifier TEXT,
+    -- the identifier of the last media processed
+    updated_at timestamp NOT NULL,
+    FOREIGN KEY (pipeline_id) REFERENCES pipelines (id) ON DELETE CASCADE
+);
+
+-- Uploads streams page through uploads newest first using (created_at, id) as a cursor.
+DROP INDEX uploads_created_at_idx;
+
+CREATE INDEX uploads_created_at_id_idx ON uploads (created_at, id);
@@ -0,0 +1,10 @@
+-- The newest media each pipeline has processed from its stream, so incremental runs can skip older media.
+CREATE TABLE pipeline_high_water_marks (
+    pipeline_id INTEGER PRIMARY KEY,
+    stream_id INTEGER NOT NULL,
+    -- the stream the mark was recorded for
+    created_at timestamp NOT NULL,
+    -- when the newest media processed was created (utc)
+    updated_at timestamp NOT NULL,
+    FOREIGN KEY (pipeline_id) REFERENCES pipelines (id) ON DELETE CASCADE
+);
@@ -0,0 +1,11 @@
+-- The number of frames in each piece of content's video stream, so fades don't have to decode the video to count them.
+ALTER TABLE content ADD COLUMN frames INTEGER;
+
+-- When `kinetic-cli database probe-videos` last probed each piece of content, so videos that can't be probed
+-- (or don't report everything) aren't probed again on every run.
+CREATE TABLE video_probes (
+    content_id TEXT PRIMARY KEY,
+    probed_at timestamp NOT NULL,
+    succeeded INTEGER NOT NULL,
+    FOREIGN KEY (content_id) REFERENCES content (id) ON DELETE CASCADE
+) WITHOUT ROWID;
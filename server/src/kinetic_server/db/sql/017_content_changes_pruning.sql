@@ -0,0 +1,17 @@
+-- Only the most recent changes are kept. Frames that synced before the oldest kept change fetch the full frame instead.
+CREATE TRIGGER content_changes_prune_trigger AFTER INSERT ON content_changes BEGIN
+    DELETE FROM content_changes WHERE seq <= new.seq - 100000;
+END;
+
+DELETE FROM content_changes WHERE seq <= (SELECT MAX(seq) FROM content_changes) - 100000;
+
+-- Rewriting a row without changing it (i.e., re-processing or re-probing content) isn't a change frames need to see.
+-- Columns added to content later need to be added here too.
+DROP TRIGGER content_changes_update_trigger;
+
+CREATE TRIGGER content_changes_update_trigger AFTER UPDATE ON content
+WHEN (old.id, old.created_at, old.processed_at, old.height, old.width, old.source_id, old.metadata, old.stream_id, old.pipeline_id, old.versions, old.poster, old.duration, old.fps, old.codec, old.bytes, old.has_audio, old.frames)
+    IS NOT (new.id, new.created_at, new.processed_at, new.height, new.width, new.source_id, new.metadata, new.stream_id, new.pipeline_id, new.versions, new.poster, new.duration, new.fps, new.codec, new.bytes, new.has_audio, new.frames)
+BEGIN
+    INSERT INTO content_changes (content_id, change) VALUES (new.id, 'updated');
+END;
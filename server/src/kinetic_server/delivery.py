@@ -0,0 +1,83 @@
+import os
+from enum import Enum
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from .object_store import ObjectStore, is_object_id
+
+# Object ids are sha256 hashes of the object's content, so a response for an id never changes.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class OffloadMode(Enum):
+    """How object bytes get to the client."""
+
+    Off = "none"  # Stream the file from python.
+    XAccelRedirect = "x-accel-redirect"  # Let nginx send the file from an internal location.
+    XSendfile = "x-sendfile"  # Let apache (mod_xsendfile) or lighttpd send the file.
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks if an If-None-Match header matches the provided (strong) etag."""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ObjectDelivery:
+    """Builds the http responses that deliver objects from the object store to clients."""
+
+    def __init__(
+        self,
+        object_store: ObjectStore,
+        offload: Optional[str] = None,
+        offload_prefix: Optional[str] = None,
+    ):
+        """Creates a new ObjectDelivery
+
+        Args:
+            object_store (ObjectStore): Where the objects are stored.
+            offload (Optional[str]): One of the OffloadMode values. Defaults to "none".
+            offload_prefix (Optional[str]): For x-accel-redirect, the internal nginx location that serves the object store folder.
+        """
+        self.object_store = object_store
+        self.offload = OffloadMode(offload) if offload else OffloadMode.Off
+        self.offload_prefix = offload_prefix or "/objects/"
+
+    def response(self, request: Request, id: str, media_type: str) -> Response:
+        """Serves an object with caching headers, answering conditional requests with a 304.
+
+        Args:
+            request (Request): The request being answered.
+            id (str): The object to send.
+            media_type (str): The object's content type.
+
+        Returns:
+            Response: The response to return from the endpoint.
+        """
+        # Checked before any path is built, so the proxy (or FileResponse) is never handed a directory of the store.
+        if not is_object_id(id):
+            raise HTTPException(status_code=404, detail="Object not found")
+        headers = {"ETag": f'"{id}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        path = self.object_store.path(id)
+        match self.offload:
+            case OffloadMode.XAccelRedirect:
+                relative_path = os.path.relpath(path, self.object_store.directory)
+                headers["X-Accel-Redirect"] = (
+                    self.offload_prefix.rstrip("/") + "/" + relative_path.replace(os.sep, "/")
+                )
+                return Response(media_type=media_type, headers=headers)
+            case OffloadMode.XSendfile:
+                headers["X-Sendfile"] = os.path.abspath(path)
+                return Response(media_type=media_type, headers=headers)
+            case _:
+                # FileResponse serves straight from disk and answers Range requests (single ranges with 206 Partial Content,
+                # multiple ranges as multipart/byteranges) so players can seek and frames can resume downloads.
+                # It also adds a Last-Modified header, and If-Range is checked against the ETag above.
+                return FileResponse(path, media_type=media_type, headers=headers)
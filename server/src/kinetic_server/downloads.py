@@ -0,0 +1,105 @@
+import contextvars
+import logging
+import os
+import shutil
+import threading
+import urllib.request
+from collections import OrderedDict
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO, List, Optional
+
+# The cache that open_url reads through, if one is open. Threads started while it's open inherit it
+# (see PipelineApi.run_all and StagedExecutor), while other runs in the same process don't see it.
+_active: contextvars.ContextVar[Optional["DownloadCache"]] = contextvars.ContextVar(
+    "download_cache", default=None
+)
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()  # Held while the url is downloaded, so other readers wait rather than download it too
+        self.filename: Optional[str] = None
+
+
+class DownloadCache:
+    """Keeps recently downloaded urls in temporary files, so that pipelines reading the same stream only download
+    each piece of media once.
+
+    While the cache is open (as a context manager), open_url reads through it in the same context and in threads started
+    with a copy of it. The files are removed when it's closed.
+    """
+
+    DEFAULT_MAX_FILES = 32
+
+    def __init__(self, max_files: Optional[int] = None):
+        """Creates a new cache
+
+        Args:
+            max_files (Optional[int]): How many downloads to keep. The least recently used are removed first.
+        """
+        self.max_files = max_files if max_files else DownloadCache.DEFAULT_MAX_FILES
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._filenames: List[str] = []
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self) -> "DownloadCache":
+        if _active.get() is not None:
+            raise Exception("Only one download cache can be open at a time.")
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        _active.reset(self._token)
+        for filename in self._filenames:
+            if os.path.exists(filename):
+                os.remove(filename)
+        logging.info(f"Downloaded {self.misses} files and reused {self.hits} downloads.")
+
+    def open(self, url: str) -> BinaryIO:
+        """Opens the file downloaded from the url, downloading it if it isn't cached.
+
+        Args:
+            url (str): What to download.
+
+        Returns:
+            BinaryIO: The downloaded file, opened for reading.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                entry = _Entry()
+                self._entries[url] = entry
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_files:
+                _, evicted = self._entries.popitem(last=False)
+                # The file is unlinked right away. Readers that already opened it keep reading it until they close it,
+                # since POSIX only frees an unlinked file's data once its last open handle is closed.
+                if evicted.filename and os.path.exists(evicted.filename):
+                    os.remove(evicted.filename)
+        with entry.lock:
+            if entry.filename and os.path.exists(entry.filename):
+                self.hits += 1
+                return open(entry.filename, "rb")
+            with urllib.request.urlopen(url) as response, NamedTemporaryFile(
+                prefix="kinetic-download-", delete=False
+            ) as fout:
+                self._filenames.append(fout.name)
+                shutil.copyfileobj(response, fout)
+            entry.filename = fout.name
+            self.misses += 1
+            return open(entry.filename, "rb")
+
+
+def open_url(url: str) -> BinaryIO:
+    """Opens the url for reading, through the download cache if one is open.
+
+    Args:
+        url (str): What to read.
+
+    Returns:
+        BinaryIO: A file-like object to read the url's contents from. Use it as a context manager to close it.
+    """
+    cache = _active.get()
+    return cache.open(url) if cache else urllib.request.urlopen(url)
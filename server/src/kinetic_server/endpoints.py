@@ -1,4 +1,3 @@
-import sys
 from dataclasses import dataclass
 from typing import Annotated, List, Optional
 
@@ -8,11 +7,12 @@ from fastapi import Request, Response, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from .common import Content, Frame
+from .common import Content, ContentCursor, Frame
 from .containers import Container
-from .db import PreRenderDb
+from .delivery import ObjectDelivery, etag_matches
 from .frames import FramesApi
-from .object_store import ObjectStore
+from .io_pool import AsyncAdapter, IoPool
+from .manifests import FrameManifestCache
 
 from fastapi import APIRouter, Depends
 
@@ -26,6 +26,18 @@ class GetFrameResult:
     frame: Frame
     content: List[Content]
     pre_render: Optional[str]
+    seq: Optional[int] = None  # The latest content change included. Pass this to /frame/{id}/changes to sync.
+    next_cursor: Optional[str] = None  # When paginating, pass this as the cursor to get the next page.
+
+
+@dataclass_json
+@dataclass
+class GetFrameChangesResult:
+    frame: Frame
+    pre_render: Optional[str]
+    seq: int  # The latest content change included
+    added: List[Content]  # Content that was added to (or changed in) the frame
+    removed: List[str]  # Ids of content that isn't in the frame anymore
 
 
 # FastAPI models
@@ -40,23 +52,119 @@ class FrameResponse(BaseModel):
 
 router = APIRouter()
 
+# How many content items are read from the database at a time when streaming responses.
+PAGE_SIZE = 1000
+
 
 # Define routes
 @router.get("/frame/{id}", response_model=dict)
 @inject
 async def get_frame(
-    frames_api: Annotated[FramesApi, Depends(Provide[Container.frames_api])],
-    prerender_db: Annotated[PreRenderDb, Depends(Provide[Container.prerender_db])],
+    frames_api: Annotated[AsyncAdapter, Depends(Provide[Container.async_frames_api])],
+    content_db: Annotated[AsyncAdapter, Depends(Provide[Container.async_content_db])],
+    prerender_db: Annotated[
+        AsyncAdapter, Depends(Provide[Container.async_prerender_db])
+    ],
+    frame_manifests: Annotated[
+        FrameManifestCache, Depends(Provide[Container.frame_manifests])
+    ],
+    id: str,
+    request: Request,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    if page_size:
+        return await _get_frame_page(
+            frames_api, content_db, prerender_db, id, page_size, cursor
+        )
+
+    manifest = frame_manifests.get(id)
+    if not manifest:
+        generation = frame_manifests.generation
+        frame = await frames_api.get(id)
+        if not frame:
+            raise HTTPException(status_code=404, detail="Frame not found")
+
+        # Read the change log first so that changes made while the content is read are re-sent, not missed.
+        seq = await content_db.latest_change()
+        content = await frames_api.get_content_for(id)
+        pre_renders = await prerender_db.get_for_frame(frame_id=id, limit=1)
+        pre_render_hash = pre_renders[0].video_hash if pre_renders else None
+        resp = GetFrameResult(
+            frame=frame, content=content, pre_render=pre_render_hash, seq=seq
+        )
+        manifest = frame_manifests.put(id, resp.to_json().encode(), generation)
+
+    # Frames have to revalidate each poll, but an unchanged frame costs them an empty 304.
+    headers = {"ETag": manifest.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), manifest.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=manifest.body, media_type="application/json", headers=headers)
+
+
+async def _get_frame_page(
+    frames_api: AsyncAdapter,
+    content_db: AsyncAdapter,
+    prerender_db: AsyncAdapter,
     id: str,
+    page_size: int,
+    cursor: Optional[str],
+) -> dict:
+    frame = await frames_api.get(id)
+    if not frame:
+        raise HTTPException(status_code=404, detail="Frame not found")
+    try:
+        after = ContentCursor.decode(cursor) if cursor else None
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # The first page carries the change log position so that the pages, once all read, can be kept in sync.
+    # It's read first so that changes made while the pages are read are re-sent, not missed.
+    seq = await content_db.latest_change() if after is None else None
+    content, next_cursor = await frames_api.get_content_page(id, page_size, after)
+    pre_renders = await prerender_db.get_for_frame(frame_id=id, limit=1)
+    pre_render_hash = pre_renders[0].video_hash if pre_renders else None
+    resp = GetFrameResult(
+        frame=frame,
+        content=content,
+        pre_render=pre_render_hash,
+        seq=seq,
+        next_cursor=next_cursor.encode() if next_cursor else None,
+    )
+    return resp.to_dict()
+
+
+@router.get("/frame/{id}/changes", response_model=dict)
+@inject
+async def get_frame_changes(
+    frames_api: Annotated[AsyncAdapter, Depends(Provide[Container.async_frames_api])],
+    prerender_db: Annotated[
+        AsyncAdapter, Depends(Provide[Container.async_prerender_db])
+    ],
+    id: str,
+    since: int,
 ):
-    frame = frames_api.get(id)
+    frame = await frames_api.get(id)
     if not frame:
         raise HTTPException(status_code=404, detail="Frame not found")
 
-    content = frames_api.get_content_for(id)
-    pre_renders = prerender_db.get_for_frame(frame_id=id, limit=1)
+    changes = await frames_api.get_changes_for(id, since)
+    if changes is None:
+        raise HTTPException(
+            status_code=410,
+            detail="The frame can't be synced from the requested sequence number -- fetch the full frame instead",
+        )
+    seq, added, removed = changes
+    if since > seq:
+        raise HTTPException(
+            status_code=410,
+            detail="The change log is behind the requested sequence number -- fetch the full frame instead",
+        )
+    pre_renders = await prerender_db.get_for_frame(frame_id=id, limit=1)
     pre_render_hash = pre_renders[0].video_hash if pre_renders else None
-    resp = GetFrameResult(frame=frame, content=content, pre_render=pre_render_hash)
+    resp = GetFrameChangesResult(
+        frame=frame, pre_render=pre_render_hash, seq=seq, added=added, removed=removed
+    )
     return resp.to_dict()
 
 
@@ -64,50 +172,54 @@ async def get_frame(
 @inject
 async def get_playlist(
     frames_api: Annotated[FramesApi, Depends(Provide[Container.frames_api])],
+    io_pool: Annotated[IoPool, Depends(Provide[Container.io_pool])],
     id: str,
     request: Request,
 ):
     if id == "all":
         version = "faded"
-        content = frames_api._content_db.query(sys.maxsize)
+        content = frames_api._content_db.iterate(PAGE_SIZE, rows=True)
     else:
-        frame = frames_api.get(id)
+        frame = await io_pool.run(frames_api.get, id)
         if not frame:
             raise HTTPException(status_code=404, detail="Frame not found")
 
         version = frame.options.get("preffered_version", "original")
-        content = frames_api.get_content_for(id)
+        content = frames_api.iterate_content_for(id, PAGE_SIZE, rows=True)
 
-    res = "#EXTM3U\n"
     base_url = str(request.base_url)
-    for c in content:
-        content_id = c.versions.get(version, c.id)
-        duration = (
-            str(int(c.metadata["duration"]))
-            if c.metadata and "duration" in c.metadata
-            else ""
-        )
-        res += f"#EXINF:{duration}\n{base_url}video/{content_id}\n"
-    res += "#EXT-X-ENDLIST"
 
-    return Response(content=res, media_type="video/mp4")
+    # The playlist is sent a page at a time as the content is read from the database on the io pool.
+    def playlist():
+        yield "#EXTM3U\n"
+        lines = []
+        for c in content:
+            content_id = c.versions.get(version, c.id)
+            duration = str(int(c.duration)) if c.duration is not None else ""
+            lines.append(f"#EXINF:{duration}\n{base_url}video/{content_id}\n")
+            if len(lines) == PAGE_SIZE:
+                yield "".join(lines)
+                lines = []
+        yield "".join(lines) + "#EXT-X-ENDLIST"
+
+    return StreamingResponse(io_pool.iterate(playlist()), media_type="video/mp4")
 
 
 @router.get("/video/{id}")
 @inject
 async def get_video(
-    object_store: Annotated[ObjectStore, Depends(Provide[Container.object_store])],
+    object_delivery: Annotated[
+        ObjectDelivery, Depends(Provide[Container.object_delivery])
+    ],
+    object_store: Annotated[
+        AsyncAdapter, Depends(Provide[Container.async_object_store])
+    ],
     id: str,
+    request: Request,
 ):
-    if object_store.exists(id):
-        video_object = object_store.get(id)
+    if await object_store.exists(id):
         # TODO -- ensure that the content type is correct - maybe store it in the objectstore?
-        headers = {
-            "Accept-Ranges": "bytes",
-            "Content-Range": f"bytes 0-{len(video_object)}/{len(video_object)}",
-            "Content-Length": str(len(video_object)),
-        }
-        return StreamingResponse(iter([video_object]), media_type="video/mp4", headers=headers)
+        return object_delivery.response(request, id, "video/mp4")
     else:
         raise HTTPException(status_code=404, detail="Video not found")
 
@@ -115,11 +227,16 @@ async def get_video(
 @router.get("/poster/{id}")
 @inject
 async def get_poster(
-    object_store: Annotated[ObjectStore, Depends(Provide[Container.object_store])],
+    object_delivery: Annotated[
+        ObjectDelivery, Depends(Provide[Container.object_delivery])
+    ],
+    object_store: Annotated[
+        AsyncAdapter, Depends(Provide[Container.async_object_store])
+    ],
     id: str,
+    request: Request,
 ):
-    if object_store.exists(id):
-        poster_object = object_store.get(id)
-        return StreamingResponse(iter([poster_object]), media_type="image/jpeg")
+    if await object_store.exists(id):
+        return object_delivery.response(request, id, "image/jpeg")
     else:
         raise HTTPException(status_code=404, detail="Poster not found")
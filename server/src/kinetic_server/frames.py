@@ -1,10 +1,10 @@
 import random
 import uuid
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple, Union
 
 import pandas as pd
 
-from kinetic_server.common import Content, Frame
+from kinetic_server.common import Content, ContentCursor, ContentRow, Frame
 from kinetic_server.db import ContentDb, FramesDb
 
 
@@ -12,6 +12,7 @@ class FrameOptions:
     QUERY_PARAMS = "content_query_params"
     SHUFFLE = "shuffle"
     DEFAULT_LIMIT = 100000
+    CHANGES_BATCH_SIZE = 500
 
 
 class FramesApi:
@@ -19,26 +20,106 @@ class FramesApi:
         self._db = db
         self._content_db = content_db
 
-    def get_content_for(self, id: str, limit: Optional[int] = None) -> List[Content]:
+    def get_content_for(
+        self, id: str, limit: Optional[int] = None, rows: bool = False
+    ) -> List[Union[Content, ContentRow]]:
         """Materializes content for the provided kinetic photo frame.
         Newer content appears at the top of the list.
 
         Args:
             id (str): The id of the frame.
             limit (Optional[int], optional): If set, only return this number of results. Defaults to None.
+            rows (bool, optional): If True, return lightweight ContentRows instead of Content. Defaults to False.
 
         Returns:
-            List[Content]: The content for this frame.
+            List[Union[Content, ContentRow]]: The content for this frame.
         """
         frame = self._db.get(id)
         query_params = frame.options.get(FrameOptions.QUERY_PARAMS, {})
         limit = limit if limit else FrameOptions.DEFAULT_LIMIT
         shuffle = frame.options.get(FrameOptions.SHUFFLE, False)
-        content = self._content_db.query(limit=limit, **query_params)
+        fetch = self._content_db.ids_and_versions if rows else self._content_db.query
+        content = fetch(limit=limit, **query_params)
         if shuffle:
             random.shuffle(content)
         return content
 
+    def get_content_page(
+        self, id: str, page_size: int, after: Optional[ContentCursor] = None
+    ) -> Tuple[List[Content], Optional[ContentCursor]]:
+        """Reads one page of content for the provided frame. Newer content appears first.
+        Pages are never shuffled.
+
+        Args:
+            id (str): The id of the frame.
+            page_size (int): The maximum number of items to return.
+            after (Optional[ContentCursor], optional): The cursor returned with the previous page, or None for the first page.
+
+        Returns:
+            Tuple[List[Content], Optional[ContentCursor]]: The page, and the cursor for the next page if there may be one.
+        """
+        frame = self._db.get(id)
+        query_params = frame.options.get(FrameOptions.QUERY_PARAMS, {})
+        content = self._content_db.query(limit=page_size, after=after, **query_params)
+        next_cursor = ContentCursor.of(content[-1]) if len(content) == page_size else None
+        return content, next_cursor
+
+    def iterate_content_for(
+        self, id: str, page_size: int, rows: bool = False
+    ) -> Iterator[Union[Content, ContentRow]]:
+        """Iterates over the content of the provided frame, reading it from the database a page at a time.
+        Shuffled frames have to be read all at once.
+
+        Args:
+            id (str): The id of the frame.
+            page_size (int): How many items to read at once.
+            rows (bool, optional): If True, yield lightweight ContentRows instead of Content. Defaults to False.
+
+        Yields:
+            Union[Content, ContentRow]: The frame's content.
+        """
+        frame = self._db.get(id)
+        if frame.options.get(FrameOptions.SHUFFLE, False):
+            yield from self.get_content_for(id, rows=rows)
+        else:
+            query_params = frame.options.get(FrameOptions.QUERY_PARAMS, {})
+            yield from self._content_db.iterate(
+                page_size, limit=FrameOptions.DEFAULT_LIMIT, rows=rows, **query_params
+            )
+
+    def get_changes_for(
+        self, id: str, since: int
+    ) -> Optional[Tuple[int, List[Content], List[str]]]:
+        """Finds the content that entered or left a frame since a point in the content change log.
+        Membership is decided by the frame's query parameters. Changes can't tell which content falls past the
+        frame's limit, so a frame that is over its limit has to be fetched in full instead.
+
+        Args:
+            id (str): The id of the frame.
+            since (int): The sequence number of the last change the caller has seen.
+
+        Returns:
+            Optional[Tuple[int, List[Content], List[str]]]: The sequence number of the latest change,
+                the changed content that now belongs to the frame, and the ids of changed content that doesn't.
+                None if the caller has to fetch the full frame: it's over its limit, or the changes since `since`
+                were pruned from the change log.
+        """
+        frame = self._db.get(id)
+        query_params = frame.options.get(FrameOptions.QUERY_PARAMS, {})
+        seq, changed = self._content_db.changed_since(since)
+        if changed is None or self._content_db.exceeds(
+            FrameOptions.DEFAULT_LIMIT, **query_params
+        ):
+            return None
+        added = []
+        # Look the changes up in batches to stay under sqlite's limit on query variables.
+        for i in range(0, len(changed), FrameOptions.CHANGES_BATCH_SIZE):
+            batch = changed[i : i + FrameOptions.CHANGES_BATCH_SIZE]
+            added += self._content_db.query(limit=len(batch), ids=batch, **query_params)
+        added_ids = set([c.id for c in added])
+        removed = [i for i in changed if i not in added_ids]
+        return seq, added, removed
+
     def get(self, id: str) -> Frame:
         """Retrieves the frame with the provided identifier
 
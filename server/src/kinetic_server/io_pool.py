@@ -0,0 +1,70 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+
+
+class IoPool:
+    """A bounded pool of threads that blocking calls (sqlite queries, disk reads) are run on
+    so that they don't stall the server's event loop.
+    """
+
+    DEFAULT_THREADS = 8
+
+    def __init__(self, threads: Optional[int] = None):
+        """Creates a new pool
+
+        Args:
+            threads (Optional[int]): How many blocking calls may run at once. Defaults to DEFAULT_THREADS.
+        """
+        self.threads = threads if threads else IoPool.DEFAULT_THREADS
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="kinetic-io"
+        )
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Runs a blocking function on the pool and waits for its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def iterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """Consumes a blocking iterator on the pool, one item per call.
+        Yield pages rather than single rows from the iterator to keep the number of hand-offs down.
+        """
+        while True:
+            item = await self.run(next, iterator, _END)
+            if item is _END:
+                return
+            yield item
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class AsyncAdapter:
+    """Wraps a blocking object (i.e., ContentDb or ObjectStore) so that each of its methods
+    becomes a coroutine that runs on an IoPool.
+
+    For example, `await AsyncAdapter(frames_api, pool).get(id)` runs `frames_api.get(id)` on the pool.
+    Attributes that aren't methods are returned as they are.
+    """
+
+    def __init__(self, target: Any, pool: IoPool):
+        self.target = target
+        self.pool = pool
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.target, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await self.pool.run(attr, *args, **kwargs)
+
+        return call
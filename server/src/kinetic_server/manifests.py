@@ -0,0 +1,78 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class FrameManifest:
+    etag: str  # A strong etag computed from the body
+    body: bytes  # The serialized /frame response
+    created_at: float  # time.monotonic() when this manifest was built
+
+
+class FrameManifestCache:
+    """Keeps the serialized /frame response of each frame in memory so that polling frames
+    don't query the database or re-serialize their content on every request.
+
+    Entries are invalidated by the databases that write frames, content, and pre-renders.
+    Writes made by other processes (i.e., `kinetic-cli pipelines run`) can't be seen here,
+    so entries also expire after a ttl.
+    """
+
+    DEFAULT_TTL = 60
+
+    def __init__(self, ttl: Optional[float] = None):
+        """Creates a new cache
+
+        Args:
+            ttl (Optional[float]): How many seconds a manifest may be served for. Defaults to DEFAULT_TTL.
+        """
+        self.ttl = ttl if ttl else FrameManifestCache.DEFAULT_TTL
+        self._manifests: Dict[str, FrameManifest] = {}
+        self._lock = threading.Lock()
+        # Incremented on every invalidation so that manifests built from stale data are never stored.
+        self.generation = 0
+
+    def get(self, frame_id: str) -> Optional[FrameManifest]:
+        """Returns the cached manifest for a frame if there is a fresh one."""
+        manifest = self._manifests.get(frame_id)
+        if manifest and time.monotonic() - manifest.created_at < self.ttl:
+            return manifest
+        return None
+
+    def put(self, frame_id: str, body: bytes, generation: int) -> FrameManifest:
+        """Stores a newly built manifest.
+
+        Args:
+            frame_id (str): The frame the manifest is for.
+            body (bytes): The serialized response.
+            generation (int): The value of `generation` from before the manifest's data was read.
+                              If anything was invalidated since, the manifest is returned but not cached.
+
+        Returns:
+            FrameManifest: The manifest for the body.
+        """
+        manifest = FrameManifest(
+            etag=f'"{hashlib.sha256(body).hexdigest()}"',
+            body=body,
+            created_at=time.monotonic(),
+        )
+        with self._lock:
+            if generation == self.generation:
+                self._manifests[frame_id] = manifest
+        return manifest
+
+    def invalidate(self, frame_id: Optional[str] = None) -> None:
+        """Drops the cached manifest of a frame.
+
+        Args:
+            frame_id (Optional[str]): The frame to drop. If None, every frame is dropped.
+        """
+        with self._lock:
+            self.generation += 1
+            if frame_id is None:
+                self._manifests.clear()
+            else:
+                self._manifests.pop(frame_id, None)
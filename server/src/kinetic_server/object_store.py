@@ -1,27 +1,203 @@
 import hashlib
 import os
+import re
+import tempfile
+import threading
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+# How many bytes are read from a stream at a time when adding objects.
+CHUNK_SIZE = 1024 * 1024
+
+# Objects are named by the sha256 hash of their content. Objects stored by older versions live directly in the
+# store's directory under their hash.
+_OBJECT_ID = re.compile("^[0-9a-f]{64}$")
+
+
+# The number of bytes that did not need to be written because the object was already stored. This is kept for the
+# whole process since each thread, or dependency container, may have its own ObjectStore for the same directory.
+_bytes_deduplicated = 0
+_bytes_deduplicated_lock = threading.Lock()
+
+
+def _deduplicated(size: int) -> None:
+    global _bytes_deduplicated
+    with _bytes_deduplicated_lock:
+        _bytes_deduplicated += size
+
+
+def is_object_id(id: str) -> bool:
+    """Returns whether an id could name an object, i.e. it's a sha256 hash.
+    Anything else (like the two character shard directories) must never be turned into a path in the store."""
+    return bool(_OBJECT_ID.match(id))
+
+
+def _chunks(stream: Union[BinaryIO, Iterable[bytes]]) -> Iterable[bytes]:
+    if hasattr(stream, "read"):
+        return iter(lambda: stream.read(CHUNK_SIZE), b"")
+    return stream
+
 
 class ObjectStore:
 
-    def __init__(self, directory: str):
+    def __init__(self, directory: str, fsync: Optional[bool] = False):
+        """Creates an object store
+
+        Args:
+            directory (str): Where objects are stored on disk.
+            fsync (Optional[bool]): If True, new objects are flushed to disk before they are renamed into place.
+        """
         self.directory = directory
-    
+        self.fsync = bool(fsync)
+
+    @property
+    def bytes_deduplicated(self) -> int:
+        """The number of bytes that did not need to be written because the object was already stored,
+        by any ObjectStore in this process."""
+        return _bytes_deduplicated
+
     def _hash_path(self, hash: str) -> str:
+        # Objects are fanned out into ab/cd/<hash> sub-directories (like git) so no single directory gets too large.
+        return os.path.join(self.directory, hash[0:2], hash[2:4], hash)
+
+    def _legacy_path(self, hash: str) -> str:
         return os.path.join(self.directory, hash)
 
+    def path(self, hash: str) -> str:
+        """Returns where an object is stored on disk.
+        Objects that haven't been migrated out of the legacy flat layout yet are found there.
+
+        Args:
+            hash (str): The object to locate.
+
+        Returns:
+            str: The path of the object's file.
+        """
+        if not is_object_id(hash):
+            raise Exception(f"{hash} is not an object id.")
+        path = self._hash_path(hash)
+        if os.path.isfile(path):
+            return path
+        legacy_path = self._legacy_path(hash)
+        if os.path.isfile(legacy_path):
+            return legacy_path
+        # The object may have been migrated between the two checks above.
+        return path
+
+    def _is_present(self, hash: str, size: int) -> bool:
+        # Objects written before writes were atomic may have been truncated by a crash,
+        # so an object only counts as present if it's complete.
+        # Only the size is checked: files are named by the hash of their contents and renamed into place once
+        # they're fully written, so a file of the right size has the right contents unless the disk corrupted it.
+        # Hashing the stored copy would mean reading it all back, which is what skipping the write avoids.
+        try:
+            return os.path.getsize(self.path(hash)) == size
+        except FileNotFoundError:
+            return False
+
+    def _move_into_place(self, tmp_path: str, hash: str) -> None:
+        path = self._hash_path(hash)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        os.replace(tmp_path, path)
+        if self.fsync:
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
     def add(self, file: bytes) -> str:
         hash = hashlib.sha256(file).hexdigest()
-        with open(self._hash_path(hash), "wb") as fout:
-            fout.write(file)
+        if self._is_present(hash, len(file)):
+            _deduplicated(len(file))
+            return hash
+        return self.add_stream([file])
+
+    def add_stream(self, stream: Union[BinaryIO, Iterable[bytes]]) -> str:
+        """Adds an object to the store without loading it into memory.
+        The data is hashed while it is written to a temporary file in the store's directory,
+        which is then renamed into place so a partially written object is never visible under its hash.
+        If the object is already stored, the temporary file is discarded instead.
+
+        Args:
+            stream (Union[BinaryIO, Iterable[bytes]]): A file-like object opened in binary mode, or an iterator of byte chunks.
+
+        Returns:
+            str: The hash of the stored object.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fout:
+                for chunk in _chunks(stream):
+                    hasher.update(chunk)
+                    fout.write(chunk)
+                    size += len(chunk)
+                hash = hasher.hexdigest()
+                present = self._is_present(hash, size)
+                if self.fsync and not present:
+                    fout.flush()
+                    os.fsync(fout.fileno())
+            if present:
+                os.remove(tmp_path)
+                _deduplicated(size)
+            else:
+                self._move_into_place(tmp_path, hash)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         return hash
-    
+
+    def add_file(self, filename: str) -> str:
+        """Copies a file on disk into the store.
+
+        Args:
+            filename (str): The file to add.
+
+        Returns:
+            str: The hash of the stored object.
+        """
+        with open(filename, "rb") as fin:
+            return self.add_stream(fin)
+
     def get(self, hash: str) -> bytes:
-        with open(self._hash_path(hash), "rb") as fin:
+        with open(self.path(hash), "rb") as fin:
             return fin.read()
 
+    def open(self, hash: str) -> BinaryIO:
+        """Opens an object for streaming reads. The caller is responsible for closing it."""
+        return open(self.path(hash), "rb")
+
     def remove(self, hash: str):
-        os.remove(self._hash_path(hash))
-    
+        os.remove(self.path(hash))
+
     def exists(self, hash: str) -> bool:
-        return os.path.exists(self._hash_path(hash))
-        
+        return is_object_id(hash) and os.path.isfile(self.path(hash))
+
+    def list_legacy(self) -> Iterator[str]:
+        """Lists the hashes of objects that are still stored in the legacy flat layout."""
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if is_object_id(entry.name) and entry.is_file():
+                    yield entry.name
+
+    def migrate(self, hash: str) -> bool:
+        """Moves an object from the legacy flat layout into its fanned out directory.
+        This is safe to run while the store is in use: readers fall back to the legacy path until the move completes.
+
+        Args:
+            hash (str): The object to move.
+
+        Returns:
+            bool: False if the object was already moved (i.e., by another migration running at the same time).
+        """
+        path = self._hash_path(hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(self._legacy_path(hash), path)
+        except FileNotFoundError:
+            return False
+        return True
+
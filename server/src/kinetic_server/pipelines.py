@@ -1,23 +1,130 @@
+import contextvars
+import itertools
 import logging
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 from tempfile import NamedTemporaryFile
-from typing import Iterator, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import pandas as pd
 import tqdm
 from .object_store import ObjectStore
 
 from kinetic_server.steps.step import Step
-from kinetic_server.streams import StreamsApi
+from kinetic_server.streams import Stream, StreamFanOut, StreamsApi
 
 from .common import Content, PipelineRun, PipelineStatus, StreamMedia
 from .content import ContentApi
-from .db import ContentDb, PipelineDb
+from .db import BatchWriter, ContentDb, PipelineDb
+from .downloads import DownloadCache
+from .stages import Stage, StagedExecutor
+
+
+class PipelineOptions:
+    CONCURRENCY = "concurrency"  # How many media are processed at once
+    STAGE_WORKERS = "stage_workers"  # How many media each step processes at once, in the order of the steps
+    INCREMENTAL = "incremental"  # Only process media created after the newest media processed by previous runs
+    DEFAULT_CONCURRENCY = 1
+
+
+def _changed_fields(existing: Content, c: Content) -> Dict[str, Any]:
+    """Returns the fields of c that differ from the stored content, as arguments for ContentDb.update_fields.
+    Versions and metadata are compared key by key; keys that were removed are not considered."""
+    changes = {}
+    for name in ["created_at", "source_id", "stream_id", "pipeline_id", "poster"]:
+        if getattr(c, name) != getattr(existing, name):
+            changes[name] = getattr(c, name)
+    if c.resolution and c.resolution != existing.resolution:
+        changes["height"] = c.resolution.height
+        changes["width"] = c.resolution.width
+    if c.video_info and c.video_info != existing.video_info:
+        # VideoInfo's fields are named after their columns.
+        changes.update(c.video_info.to_dict())
+    for name, new, old in [
+        ("versions", c.versions, existing.versions),
+        ("metadata", c.metadata, existing.metadata),
+    ]:
+        changed = {k: v for k, v in (new or {}).items() if (old or {}).get(k) != v}
+        if changed:
+            changes[name] = changed
+    if changes:
+        changes["processed_at"] = c.processed_at
+    return changes
+
+
+class _StreamProgress:
+    """Wraps a stream to track which of its media have been processed, so that the stream is only checkpointed
+    past media that are all done. Media can finish out of order when they're processed concurrently.
+    """
+
+    def __init__(self, stream: Stream):
+        self._stream = stream
+        self._lock = threading.Lock()
+        # id(media) -> (the order it was read in, the stream's checkpoint just after it)
+        self._positions: Dict[int, Tuple[int, Optional[Dict[str, Any]]]] = {}
+        self._read = 0
+        # order -> (checkpoint, identifier) of media that finished before some media read earlier
+        self._finished: Dict[int, Tuple[Optional[Dict[str, Any]], str]] = {}
+        self._next = 0  # The order of the first media that hasn't finished
+        self.checkpoint: Optional[Dict[str, Any]] = None  # Where to resume so that only unfinished media are read again
+        self.last_identifier: Optional[str] = None
+        self.unsaved = 0  # How many media finished since the checkpoint was last saved
+        self._exhausted = False
+
+    def __iter__(self) -> Iterator[StreamMedia]:
+        # The stream may be read on another thread (see StagedExecutor).
+        for media in self._stream:
+            with self._lock:
+                self._positions[id(media)] = (self._read, self._stream.checkpoint())
+                self._read += 1
+            yield media
+        self._exhausted = True
+
+    def has_more(self) -> bool:
+        """Returns whether the stream has media that weren't read, i.e. a run that stopped at its limit didn't finish
+        the stream. Reads one media ahead if reading stopped before the end of the stream; call it once reading is done.
+        """
+        if self._exhausted:
+            return False
+        try:
+            next(self._stream)
+        except StopIteration:
+            return False
+        return True
+
+    def finished(self, media: StreamMedia) -> None:
+        """Marks media as processed, whether it succeeded or not."""
+        with self._lock:
+            order, checkpoint = self._positions.pop(id(media))
+        self._finished[order] = (checkpoint, media.identifier)
+        while self._next in self._finished:
+            self.checkpoint, self.last_identifier = self._finished.pop(self._next)
+            self._next += 1
+            self.unsaved += 1
+
+
+# The pipeline run the current thread is working for. Threads started during a run inherit it (see StagedExecutor).
+_current_run: contextvars.ContextVar[Optional["PipelineLogger"]] = contextvars.ContextVar(
+    "pipeline_run", default=None
+)
+
+
+class _RunFilter(logging.Filter):
+    """Only passes records logged for one pipeline run, so runs on other threads (i.e., run-all) don't share logs."""
+
+    def __init__(self, run: "PipelineLogger"):
+        super().__init__()
+        self.run = run
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return _current_run.get() is self.run
 
 
 class PipelineLogger:
     """A PipelineLogger records all logging events made during a Pipeline's run to a file and,
     once the run is completed, saves that log along with the resulting status to the database.
+    Only events logged on the run's own threads are recorded, so pipelines running at the same time keep separate logs.
+    Exceptions are recorded and then raised to the caller.
     Thus it persists errors and processing information for inspection later.
 
     The logger is a context provider that returns a logging.Logger object. To use it:
@@ -46,7 +153,10 @@ class PipelineLogger:
         self.handler.setFormatter(
             logging.Formatter("[%(asctime)s] [%(levelname)s] [%(name)s]: %(message)s")
         )
+        self.handler.addFilter(_RunFilter(self))
+        self._run_token = _current_run.set(self)
         self.logger.addHandler(self.handler)
+        self._bytes_deduplicated_at_start = self._objectstore.bytes_deduplicated
         return self.logger
 
     def __exit__(self, exception_type, exception_value, traceback):
@@ -61,11 +171,19 @@ class PipelineLogger:
             self.logger.exception(exception_value, exc_info=True)
             status = PipelineStatus.Failed
 
+        bytes_deduplicated = (
+            self._objectstore.bytes_deduplicated - self._bytes_deduplicated_at_start
+        )
+        if bytes_deduplicated:
+            self.logger.info(
+                f"Skipped writing {bytes_deduplicated} bytes that were already in the object store while the pipeline ran."
+            )
+
         # Remove the  logging hanlder
         self.logger.removeHandler(self.handler)
+        _current_run.reset(self._run_token)
         # Save the log to the objectstore
-        with open(self.logfile.name, mode="rb") as fin:
-            log_hash = self._objectstore.add(fin.read())
+        log_hash = self._objectstore.add_file(self.logfile.name)
 
         # removes the temporary file
         self.logfile.close()
@@ -85,8 +203,6 @@ class PipelineLogger:
             f"Finished running pipeline {self._name} ({self._pipeline_id}), recorded run {run_id} with status {status}"
         )
 
-        return True
-
 
 class PipelineLoggerFactory:
     """A factory for PipelineLoggers.
@@ -113,6 +229,8 @@ class Pipeline:
     See the PipelineApi for how to access these results.
     """
 
+    CHECKPOINT_EVERY = 100  # How many media are processed between saving the stream's position
+
     def __init__(
         self,
         id: int,
@@ -121,7 +239,9 @@ class Pipeline:
         steps: List[Step],
         content_db: ContentDb,
         logger_factory: PipelineLoggerFactory,
-        streams_api: StreamsApi
+        streams_api: StreamsApi,
+        pipeline_db: PipelineDb,
+        options: Optional[Dict[str, Any]] = None,
     ):
         """Creates an instance of a Pipeline object
 
@@ -131,69 +251,210 @@ class Pipeline:
             steps (List[Step]): Steps in this pipeline
             content_db (ContentDb): The content database for saving content
             logger_factory (PipelineLoggerFactory): A logger factory used to create Pipeline loggers.
+            pipeline_db (PipelineDb): The pipeline database, for saving checkpoints.
+            options (Optional[Dict[str, Any]]): How to run this pipeline (see PipelineOptions).
         """
         self.id = id
         self.stream_id = stream_id
         self.name = name
         self.steps = steps
+        self.options = options if options else {}
         self._logger_factory = logger_factory
         self._content_db = content_db
         self._streams_api = streams_api
+        self._pipeline_db = pipeline_db
 
     def __str__(self):
-        return f'Pipeline "{self.name}" ({self.id}).\n Steps:\n' + "\n".join([str(s) for s in self.steps])
+        return (
+            f'Pipeline "{self.name}" ({self.id}).\n Options: {self.options}\n Steps:\n'
+            + "\n".join([str(s) for s in self.steps])
+        )
+
+    def _run_steps(self, media: StreamMedia) -> Union[Content, StreamMedia, None]:
+        """Passes media through each step in turn, stopping early if a step drops it."""
+        content = media
+        for step in self.steps:
+            content = step(content)
+            if content is None:
+                logging.debug(
+                    f"Step {step.name} returned None for media {media.identifier}..."
+                )
+                break
+        return content
+
+    def _process(
+        self, stream: Iterable[StreamMedia], concurrency: int, stage_workers: Optional[List[int]] = None
+    ) -> Iterator[Tuple[StreamMedia, Union[Content, StreamMedia, None], Optional[Exception]]]:
+        """Runs the steps on each piece of media.
 
-    def __call__(self,  limit: Optional[int] = None) -> None:
+        Args:
+            stream (Iterable[StreamMedia]): The media to process.
+            concurrency (int): How many media each step processes at once, unless set in stage_workers.
+                If this is 1 and there are no stage_workers, media are processed one at a time in the calling thread.
+            stage_workers (Optional[List[int]]): How many media each step processes at once, in the order of the steps.
+
+        Yields:
+            Tuple[StreamMedia, Union[Content, StreamMedia, None], Optional[Exception]]: Each piece of media as it finishes,
+                with what the steps returned or the exception they raised.
+        """
+        if concurrency <= 1 and not stage_workers:
+            for media in stream:
+                try:
+                    yield media, self._run_steps(media), None
+                except Exception as e:
+                    yield media, None, e
+            return
+
+        # Each step gets its own threads, so i.e. downloads for the next media continue while one is being faded.
+        stage_workers = stage_workers if stage_workers else []
+        stages = [
+            Stage(
+                f"{i}:{step.name}",
+                step,
+                stage_workers[i] if i < len(stage_workers) else concurrency,
+            )
+            for i, step in enumerate(self.steps)
+        ]
+        logging.info(
+            "Running steps in stages: " + ", ".join(f"{s.name} x{s.workers}" for s in stages)
+        )
+        yield from StagedExecutor(stages).run(stream)
+
+    def is_incremental(self, incremental: Optional[bool] = None) -> bool:
+        """Returns whether a run should be incremental, given the run's incremental argument (see __call__)."""
+        return incremental if incremental is not None else self.options.get(PipelineOptions.INCREMENTAL, False)
+
+    def _save_checkpoint(self, progress: _StreamProgress, content_batch: BatchWriter[Content]) -> None:
+        if not progress.unsaved or progress.checkpoint is None:
+            return
+        # Buffered content is saved first, so the checkpoint is never ahead of the content saved for the media before it.
+        content_batch.flush()
+        self._pipeline_db.save_checkpoint(
+            self.id, self.stream_id, progress.checkpoint, progress.last_identifier
+        )
+        progress.unsaved = 0
+
+    def __call__(
+        self,
+        limit: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        resume: bool = False,
+        incremental: Optional[bool] = None,
+        stream: Optional[Stream] = None,
+    ) -> None:
         """Runs this Pipeline to convert stream media into kinetic photo content.
 
+        The run's position in the stream is checkpointed as media are processed, and the checkpoint is removed once
+        the whole stream has been processed. At that point the creation time of the newest media processed is also
+        recorded as the pipeline's high water mark, unless media failed: then the mark stays below the oldest media
+        that failed, so incremental runs try it again.
+
         Args:
             limit (int, optional): If set, only process this many items.
+            concurrency (int, optional): How many media to process at once. Defaults to the pipeline's concurrency option.
+                Steps the stage_workers option doesn't cover process this many media at once.
+                Steps run on worker threads; content is saved, and steps are told about it, on the calling thread.
+            resume (bool, optional): If set, continue from the last run's checkpoint rather than the start of the stream.
+            incremental (bool, optional): If set, only process media created after the high water mark, so runs take time
+                in proportion to the new media rather than the whole stream. Defaults to the pipeline's incremental option.
+            stream (Stream, optional): Read this stream instead of the pipeline's own (i.e., a copy from a StreamFanOut).
 
         Raises:
             Exception: If the pipeline fails all media an exception is thrown.
         """
+        concurrency = concurrency if concurrency else self.options.get(
+            PipelineOptions.CONCURRENCY, PipelineOptions.DEFAULT_CONCURRENCY
+        )
+        incremental = self.is_incremental(incremental)
         pipeline_logger = self._logger_factory(self)
-        with pipeline_logger as logger:
-            stream = self._streams_api.get(self.stream_id)
+        # New content is saved a batch at a time. Whatever is buffered is saved when the run ends, even if it fails.
+        with pipeline_logger as logger, self._content_db.batch() as content_batch:
+            stream = stream if stream else self._streams_api.get(self.stream_id)
+            if resume:
+                checkpoint = self._pipeline_db.get_checkpoint(self.id, self.stream_id)
+                if checkpoint:
+                    logger.info(f"Resuming stream {self.stream_id} from {checkpoint}.")
+                    stream.resume(checkpoint)
+                else:
+                    logger.info(f"There's no checkpoint to resume from, starting from the beginning of the stream.")
+            if incremental:
+                high_water_mark = self._pipeline_db.get_high_water_mark(self.id, self.stream_id)
+                if high_water_mark:
+                    logger.info(f"Only processing media created after {high_water_mark}.")
+                    stream.since(high_water_mark)
+                else:
+                    logger.info(f"There's no high water mark yet, processing the whole stream.")
+            progress = _StreamProgress(stream)
+            media_to_process = itertools.islice(progress, limit) if limit else progress
+            for step in self.steps:
+                step.on_run_start()
             num_successful = 0
             num_failed = 0
             num_new = 0
-            for i, media in tqdm.tqdm(enumerate(stream), total=limit):
-                # stop if limit is reached
-                if limit and i > limit:
-                    logger.info(f"Processed {limit} pieces of media. Stopping...")
-                    break
-
-                # Check each rule to see if we can apply it
-                content = media
-                try:
-                    # compose the steps of this pipeline together
-                    for step in self.steps:
-                        content = step(content)
-                        if not content:
-                            logger.debug(
-                                f"Step {step.name} returned None for media {media.identifier}..."
+            newest: Optional[datetime] = None  # When the newest media processed successfully was created
+            oldest_failed: Optional[datetime] = None  # When the oldest media that failed was created
+            try:
+                for media, content, error in tqdm.tqdm(
+                    self._process(media_to_process, concurrency, self.options.get(PipelineOptions.STAGE_WORKERS)),
+                    total=limit,
+                ):
+                    try:
+                        if error:
+                            raise error
+                        # perist any content that the pipeline successfully processed
+                        if type(content) == Content:
+                            content.pipeline_id = self.id
+                            existing = self._content_db.get(content.id)
+                            if existing:
+                                # Only write what the steps changed instead of rewriting the whole row.
+                                changes = _changed_fields(existing, content)
+                                if changes:
+                                    logger.info(f"Updating {', '.join(changes)} of content {content.id}.")
+                                    self._content_db.update_fields(content.id, **changes)
+                                else:
+                                    logger.info(f"Content {content.id} is unchanged.")
+                            else:
+                                logger.info(f"Created new content {content.id}!")
+                                content_batch.save(content)
+                                num_new += 1
+                            for step in self.steps:
+                                step.on_content_saved(content)
+                        elif type(content) == StreamMedia:
+                            raise Exception(
+                                f"Pipeline is misconfigured and returned stream media {content} instead of content..."
                             )
-                            break
-                    # perist any content that the pipeline successfully processed
-                    if type(content) == Content:
-                        logger.info(f"Created new content {content.id}!")
-                        content.pipeline_id = self.id
-                        self._content_db.save(content)
-                        num_new += 1
-                    elif type(content) == StreamMedia:
-                        raise Exception(
-                            f"Pipeline is misconfigured and returned stream media {content} instead of content..."
-                        )
-
-                    num_successful += 1
-                except Exception as e:
-                    logger.error(
-                        f"Failed to process media {media}.",
-                        exc_info=e,
-                    )
-                    num_failed += 1
 
+                        num_successful += 1
+                        if newest is None or media.created_at > newest:
+                            newest = media.created_at
+                    except Exception as e:
+                        logger.error(
+                            f"Failed to process media {media}.",
+                            exc_info=e,
+                        )
+                        num_failed += 1
+                        if oldest_failed is None or media.created_at < oldest_failed:
+                            oldest_failed = media.created_at
+                    finally:
+                        progress.finished(media)
+                    if progress.unsaved >= Pipeline.CHECKPOINT_EVERY:
+                        self._save_checkpoint(progress, content_batch)
+            finally:
+                # Whatever was processed is checkpointed, even if the run failed or stopped early.
+                self._save_checkpoint(progress, content_batch)
+
+            # A stream with exactly `limit` media was read to its end, so it's finished rather than stopped early.
+            if limit and num_successful + num_failed == limit and progress.has_more():
+                logger.info(f"Processed {limit} pieces of media. Stopping...")
+            else:
+                # The whole stream was processed, so the next run starts from the beginning.
+                content_batch.flush()
+                self._pipeline_db.clear_checkpoint(self.id)
+                if newest and oldest_failed:
+                    # Media created after the failure that succeeded are processed again, which leaves them unchanged.
+                    newest = min(newest, oldest_failed - timedelta(microseconds=1))
+                if newest:
+                    self._pipeline_db.advance_high_water_mark(self.id, self.stream_id, newest)
             if num_failed > 0 and num_successful == 0:
                 # The processor is consistently failing, throw here to fail the pipeline run
                 raise Exception(
@@ -233,8 +494,72 @@ class PipelineApi:
         Returns:
             Pipeline: An instantiated pipeline object that represents this pipeline from the database.
         """
-        id, stream_id, name, steps = self._db.get(id)
-        return Pipeline(id, stream_id, name, steps, self.content_db, self._logger_factory, self._streams_api)
+        id, stream_id, name, steps, options = self._db.get(id)
+        return Pipeline(
+            id, stream_id, name, steps, self.content_db, self._logger_factory, self._streams_api, self._db, options
+        )
+
+    def run_all(
+        self, limit: Optional[int] = None, concurrency: Optional[int] = None, incremental: Optional[bool] = None
+    ) -> None:
+        """Runs every pipeline, reading each stream once for all of the pipelines that use it.
+
+        Pipelines that share a stream run at the same time, each on its own copy of the stream's media, and media
+        downloaded by one of them are reused by the others (see DownloadCache). Streams are run one after another.
+
+        Args:
+            limit (int, optional): If set, each pipeline only processes this many items.
+            concurrency (int, optional): How many media each pipeline processes at once (see Pipeline.__call__).
+            incremental (bool, optional): Whether to only process media newer than each pipeline's high water mark.
+                Defaults to each pipeline's incremental option.
+        """
+        pipelines_by_stream: Dict[int, List[Pipeline]] = {}
+        for pipeline_id in self._db.list().index:
+            pipeline = self.get(int(pipeline_id))
+            pipelines_by_stream.setdefault(pipeline.stream_id, []).append(pipeline)
+        for stream_id, pipelines in pipelines_by_stream.items():
+            logging.info(
+                f"Running pipelines {', '.join(str(p.id) for p in pipelines)} on stream {stream_id}..."
+            )
+            self._run_together(stream_id, pipelines, limit, concurrency, incremental)
+
+    def _run_together(
+        self,
+        stream_id: int,
+        pipelines: List[Pipeline],
+        limit: Optional[int],
+        concurrency: Optional[int],
+        incremental: Optional[bool],
+    ) -> None:
+        stream = self._streams_api.get(stream_id)
+        # The stream only skips media that all of the pipelines have seen. Each pipeline skips the rest of what it's seen.
+        high_water_marks = [
+            self._db.get_high_water_mark(p.id, stream_id) if p.is_incremental(incremental) else None
+            for p in pipelines
+        ]
+        if all(high_water_marks):
+            stream.since(min(high_water_marks))
+
+        def run(pipeline: Pipeline, stream_copy: Stream) -> None:
+            try:
+                pipeline(limit, concurrency=concurrency, incremental=incremental, stream=stream_copy)
+            except Exception as e:
+                logging.error(f"Pipeline {pipeline.name} ({pipeline.id}) failed.", exc_info=e)
+            finally:
+                stream_copy.close()
+
+        with StreamFanOut(stream, len(pipelines)) as stream_copies, DownloadCache():
+            threads = [
+                # Each thread runs in a copy of this context, so it reads through the download cache opened above.
+                threading.Thread(
+                    target=contextvars.copy_context().run, args=(run, p, c), name=f"pipeline-{p.id}"
+                )
+                for p, c in zip(pipelines, stream_copies)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
 
     def list(self) -> pd.DataFrame:
         """Lists all pipelines in the database.
@@ -265,6 +590,19 @@ class PipelineApi:
         id = self._db.create(name, stream_id)
         return self.get(id)
 
+    def set_options(self, pipeline_id: int, **options) -> Pipeline:
+        """Sets options for running the indicated pipeline (see PipelineOptions). Other options are kept.
+
+        Args:
+            pipeline_id (int): The pipeline to change.
+            **options: The options to set. Options set to None are removed.
+
+        Returns:
+            Pipeline: A new pipeline object with the options set.
+        """
+        self._db.set_options(pipeline_id, **options)
+        return self.get(pipeline_id)
+
     def add_step(self, pipeline_id: int, step: Step) -> Pipeline:
         """Adds a step to the indicated pipeline
 
@@ -19,7 +19,12 @@ class PreRenderApi:
 
     def _create_video(
         self, paths: List[str], width: int, height: int, video_bitrate: int
-    ) -> bytes:
+    ) -> str:
+        """Renders the provided videos into a single clip and streams it into the object store.
+
+        Returns:
+            str: The object hash of the rendered video.
+        """
         width = str(width)
         height = str(height)
         with NamedTemporaryFile(suffix="playlist.txt") as tmpfile:
@@ -79,8 +84,7 @@ class PreRenderApi:
                 ]
                 logging.info(f"Building video with command:" + " ".join(cmd))
                 subprocess.run(cmd, check=True)
-                with open(resultfile.name, "rb") as fin:
-                    return fin.read()
+                return self.os.add_file(resultfile.name)
 
     def render_if_necessary(
         self,
@@ -95,7 +99,7 @@ class PreRenderApi:
 
         # Get the video ids list of the frame
         frame = self.frames_api.get(frame_id)
-        content = self.frames_api.get_content_for(frame_id, sys.maxsize)
+        content = self.frames_api.get_content_for(frame_id, sys.maxsize, rows=True)
         preffered_version = (
             frame.options["preffered_version"]
             if "preffered_version" in frame.options
@@ -111,7 +115,6 @@ class PreRenderApi:
             return last_render[0]
         else:
             logging.info(f"Rendering video for frame {frame_id}")
-            paths = [self.os._hash_path(id) for id in video_ids]
-            video_bytes = self._create_video(paths, width, height, video_bitrate)
-            video_hash = self.os.add(video_bytes)
+            paths = [self.os.path(id) for id in video_ids]
+            video_hash = self._create_video(paths, width, height, video_bitrate)
             return self.db.create(frame_id, video_hash=video_hash, video_ids=video_ids)
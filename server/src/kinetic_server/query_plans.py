@@ -0,0 +1,314 @@
+"""
+Checks that the queries made by the *Db classes are answered from indexes.
+
+A temporary database is seeded with a realistic amount of data, then every query method is run
+while the sql it executes is recorded. Each statement's `EXPLAIN QUERY PLAN` is inspected for full table scans
+and sorts of the whole result, which is how a missing or unusable index shows up.
+"""
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from .common import ContentCursor, PipelineStatus
+from .db import (
+    AuxiliaryCacheDb,
+    ConnectionPool,
+    ContentDb,
+    FramesDb,
+    IntegrationsDb,
+    PipelineDb,
+    PreRenderDb,
+    StreamsDb,
+    UploadsDb,
+)
+
+# Plan details that mean a query reads a whole table, or sorts everything it read.
+_FULL_SCAN = re.compile(r"^SCAN \w+$")
+_FULL_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+_START = datetime(2015, 1, 1)
+# Camera models put in seeded metadata, for the search queries.
+_CAMERAS = ["Pixel 7", "iPhone 14 Pro", "Galaxy S23", "DJI Osmo"]
+
+
+class _TracingPool(ConnectionPool):
+    """A ConnectionPool that records every statement its connections execute."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements: List[str] = []
+        self._writer.set_trace_callback(self.statements.append)
+
+    def _open_reader(self) -> sqlite3.Connection:
+        connection = super()._open_reader()
+        connection.set_trace_callback(self.statements.append)
+        return connection
+
+
+@dataclass
+class QueryPlan:
+    sql: str  # The statement that was executed, with its parameters filled in
+    plan: List[str]  # The details of each step of the statement's query plan
+    problems: List[str]  # The steps that scan or sort a whole table
+
+
+@dataclass
+class CaseResult:
+    name: str
+    median_ms: float  # The median time of the method call
+    plans: List[QueryPlan] = field(default_factory=list)
+    allow_scan: bool = False  # If the method is expected to read a whole table (i.e., list()) or sort what it reads
+
+    @property
+    def failed(self) -> bool:
+        return not self.allow_scan and any(p.problems for p in self.plans)
+
+
+@dataclass
+class _Case:
+    name: str
+    run: Callable[[], object]
+    allow_scan: bool = False
+
+
+def seed(pool: ConnectionPool, content: int, runs: int, seed: Optional[int] = 0) -> None:
+    """Fills a database with generated data.
+
+    Args:
+        pool (ConnectionPool): The database to fill.
+        content (int): How many content rows to create. Uploads and auxiliary data are a tenth of this.
+        runs (int): How many pipeline runs to create.
+        seed (Optional[int]): Seeds the random data so runs are comparable.
+    """
+    rnd = random.Random(seed)
+    streams = 5
+    pipelines = 10
+    frames = 10
+    with pool.writer() as connection:
+        connection.executemany(
+            "INSERT INTO integrations (id, name, type, params) VALUES (?, ?, ?, ?)",
+            [(1, "integration", "GooglePhotos", "{}")],
+        )
+        connection.executemany(
+            "INSERT INTO streams (id, name, type, integration_id, params_json) VALUES (?, ?, ?, ?, ?)",
+            [(i, f"stream {i}", "Uploads", 1, "{}") for i in range(1, streams + 1)],
+        )
+        connection.executemany(
+            "INSERT INTO pipelines (id, stream_id, name) VALUES (?, ?, ?)",
+            [(i, 1 + i % streams, f"pipeline {i}") for i in range(1, pipelines + 1)],
+        )
+        connection.executemany(
+            "INSERT INTO frames (id, name, options) VALUES (?, ?, ?)",
+            [(f"frame-{i}", f"frame {i}", "{}") for i in range(frames)],
+        )
+
+        def created_at() -> datetime:
+            return _START + timedelta(seconds=rnd.randrange(10 * 365 * 24 * 3600))
+
+        connection.executemany(
+            "INSERT INTO content (id, created_at, processed_at, height, width, source_id, metadata, stream_id, pipeline_id, versions, poster) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    f"{i:064x}",
+                    created_at(),
+                    datetime.now(),
+                    1080,
+                    1920,
+                    f"source-{i}",
+                    json.dumps(
+                        {
+                            "orientation": rnd.choice(["Tall", "Wide", "Square"]),
+                            "duration": rnd.uniform(1, 10),
+                            "filename": f"VID_{i:06d}.mp4",
+                            "Model": rnd.choice(_CAMERAS),
+                        }
+                    ),
+                    1 + i % streams,
+                    1 + i % pipelines,
+                    json.dumps({"original": f"{i:064x}", "faded": f"{i:064x}"}),
+                    None,
+                )
+                for i in range(content)
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO uploads (id, created_at, uploaded_at, metadata, content_type) VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    f"upload-{i}",
+                    created_at(),
+                    datetime.now(),
+                    json.dumps({"filename": f"VID_{i:06d}.mp4", "Model": rnd.choice(_CAMERAS)}),
+                    "video/mp4",
+                )
+                for i in range(content // 10)
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO auxiliary_cache (id, computed_at, type, file_hash) VALUES (?, ?, ?, ?)",
+            (
+                (f"{i:064x}", datetime.now(), "depth", f"{i:064x}")
+                for i in range(content // 10)
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO pipeline_runs (pipeline_id, log_hash, status, completed_at) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    1 + i % pipelines,
+                    f"{i:064x}",
+                    rnd.choice(list(PipelineStatus)),
+                    created_at(),
+                )
+                for i in range(runs)
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO pre_renders (frame_id, created_at, video_hash, video_ids) VALUES (?, ?, ?, ?)",
+            (
+                (f"frame-{i % frames}", created_at(), f"{i:064x}", "[]")
+                for i in range(runs // 10)
+            ),
+        )
+
+
+def _cases(pool: ConnectionPool) -> List[_Case]:
+    content_db = ContentDb(pool)
+    frames_db = FramesDb(pool)
+    pipeline_db = PipelineDb(pool)
+    uploads_db = UploadsDb(pool)
+    auxiliary_db = AuxiliaryCacheDb(pool)
+    prerender_db = PreRenderDb(pool)
+    streams_db = StreamsDb(pool)
+    integrations_db = IntegrationsDb(pool)
+
+    some_id = f"{1:064x}"
+    cursor = ContentCursor(_START + timedelta(days=5 * 365), some_id)
+    middle = (_START + timedelta(days=5 * 365)).isoformat()
+    return [
+        _Case("ContentDb.query()", lambda: content_db.query(100)),
+        _Case("ContentDb.query(after)", lambda: content_db.query(100, after=cursor)),
+        # A source id matches a handful of rows at most, so sorting them is cheap.
+        _Case("ContentDb.query(source_id)", lambda: content_db.query(100, source_id="source-1"), allow_scan=True),
+        _Case("ContentDb.query(source_id, stream_id, pipeline_id)", lambda: content_db.query(1, source_id="source-1", stream_id=2, pipeline_id=2), allow_scan=True),
+        _Case("ContentDb.seen_sources", lambda: content_db.seen_sources(2, 2)),
+        _Case("ContentDb.find_by_object", lambda: content_db.find_by_object(some_id)),
+        _Case("ContentDb.find_by_object(version)", lambda: content_db.find_by_object(some_id, "faded")),
+        _Case("ContentDb.query(search)", lambda: content_db.query(100, search="VID_000123"), allow_scan=True),
+        _Case("ContentDb.query(search, common)", lambda: content_db.query(100, search="pixel"), allow_scan=True),
+        _Case("ContentDb.missing_video_info", lambda: content_db.missing_video_info(), allow_scan=True),
+        _Case("ContentDb.query(stream_id)", lambda: content_db.query(100, stream_id=2)),
+        _Case("ContentDb.query(stream_id, after)", lambda: content_db.query(100, stream_id=2, after=cursor)),
+        _Case("ContentDb.query(pipeline_id)", lambda: content_db.query(100, pipeline_id=2)),
+        _Case("ContentDb.query(orientation)", lambda: content_db.query(100, orientation="Tall")),
+        _Case("ContentDb.query(orientation, after)", lambda: content_db.query(100, orientation="Tall", after=cursor)),
+        _Case("ContentDb.query(created_after)", lambda: content_db.query(100, created_after=middle)),
+        _Case("ContentDb.query(created_before)", lambda: content_db.query(100, created_before=middle)),
+        _Case("ContentDb.query(orientation, created_after)", lambda: content_db.query(100, orientation="Wide", created_after=middle)),
+        _Case("ContentDb.query(ids)", lambda: content_db.query(100, ids=[f"{i:064x}" for i in range(100)]), allow_scan=True),
+        _Case("ContentDb.exceeds(stream_id)", lambda: content_db.exceeds(100, stream_id=2)),
+        _Case("ContentDb.latest_change", lambda: content_db.latest_change()),
+        _Case("ContentDb.changed_since", lambda: content_db.changed_since(0)),
+        _Case("FramesDb.get", lambda: frames_db.get("frame-1")),
+        _Case("FramesDb.search", lambda: frames_db.search(), allow_scan=True),
+        _Case("FramesDb.list", lambda: frames_db.list(), allow_scan=True),
+        _Case("PreRenderDb.get_for_frame", lambda: prerender_db.get_for_frame("frame-1", 1)),
+        _Case("PipelineDb.get", lambda: pipeline_db.get(1)),
+        _Case("PipelineDb.get_steps", lambda: pipeline_db.get_steps(1)),
+        # Reads the newest runs in rowid order and stops at the limit.
+        _Case("PipelineDb.get_runs()", lambda: pipeline_db.get_runs(None, None, None, 100), allow_scan=True),
+        _Case("PipelineDb.get_runs(pipeline_id)", lambda: pipeline_db.get_runs(1, None, None, 100)),
+        _Case("PipelineDb.get_runs(status)", lambda: pipeline_db.get_runs(None, PipelineStatus.Failed, None, 100)),
+        _Case("PipelineDb.get_runs(pipeline_id, status)", lambda: pipeline_db.get_runs(1, PipelineStatus.Failed, None, 100)),
+        _Case("PipelineDb.get_runs(pipeline_id, bookmark)", lambda: pipeline_db.get_runs(1, None, 5000, 100)),
+        _Case("PipelineDb.get_run", lambda: pipeline_db.get_run(1)),
+        _Case("PipelineDb.get_checkpoint", lambda: pipeline_db.get_checkpoint(1, 2)),
+        _Case("PipelineDb.get_high_water_mark", lambda: pipeline_db.get_high_water_mark(1, 2)),
+        _Case("PipelineDb.list", lambda: pipeline_db.list(), allow_scan=True),
+        _Case("PipelineDb.list_runs", lambda: pipeline_db.list_runs(), allow_scan=True),
+        _Case("UploadsDb.get", lambda: uploads_db.get("upload-1")),
+        _Case("UploadsDb.query()", lambda: uploads_db.query(100)),
+        _Case("UploadsDb.query(created_after)", lambda: uploads_db.query(100, created_after=middle)),
+        _Case("UploadsDb.query(after)", lambda: uploads_db.query(100, after=(middle, "upload-1"))),
+        _Case("UploadsDb.query(search)", lambda: uploads_db.query(100, search="VID_000123"), allow_scan=True),
+        _Case("UploadsDb.list", lambda: uploads_db.list(), allow_scan=True),
+        _Case("AuxiliaryCacheDb.get", lambda: auxiliary_db.get(some_id, "depth")),
+        _Case("StreamsDb.get", lambda: streams_db.get(1)),
+        _Case("StreamsDb.list", lambda: streams_db.list(), allow_scan=True),
+        _Case("IntegrationsDb.get", lambda: integrations_db.get(1)),
+        _Case("IntegrationsDb.list", lambda: integrations_db.list(), allow_scan=True),
+    ]
+
+
+def _is_query(sql: str) -> bool:
+    return sql.lstrip().split(" ", 1)[0].upper() in ("SELECT", "WITH")
+
+
+def _explain(connection: sqlite3.Connection, sql: str) -> QueryPlan:
+    plan = [r[3] for r in connection.execute("EXPLAIN QUERY PLAN " + sql).fetchall()]
+    problems = [p for p in plan if _FULL_SCAN.match(p) or _FULL_SORT in p]
+    return QueryPlan(sql=sql, plan=plan, problems=problems)
+
+
+def check(pool: _TracingPool, repeat: Optional[int] = 5) -> List[CaseResult]:
+    """Runs every query method against a seeded database and explains the sql each one executed.
+
+    Args:
+        pool (_TracingPool): The seeded database.
+        repeat (Optional[int]): How many times each method is timed.
+
+    Returns:
+        List[CaseResult]: The plans and timings of each method.
+    """
+    results = []
+    for case in _cases(pool):
+        timings = []
+        for i in range(repeat):
+            pool.statements.clear()
+            start = time.perf_counter()
+            case.run()
+            timings.append((time.perf_counter() - start) * 1000)
+        statements = [s for s in pool.statements if _is_query(s)]
+        with pool.reader() as connection:
+            plans = [_explain(connection, s) for s in statements]
+        results.append(
+            CaseResult(
+                name=case.name,
+                median_ms=statistics.median(timings),
+                plans=plans,
+                allow_scan=case.allow_scan,
+            )
+        )
+    return results
+
+
+def check_plans(
+    content: int, runs: int, directory: Optional[str] = None
+) -> List[CaseResult]:
+    """Seeds a temporary database and checks the query plans of every query method.
+
+    Args:
+        content (int): How many content rows to seed.
+        runs (int): How many pipeline runs to seed.
+        directory (Optional[str]): Where to create the temporary database.
+
+    Returns:
+        List[CaseResult]: The plans and timings of each method.
+    """
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        pool = _TracingPool(
+            database=os.path.join(tmp, "query_plans.db"),
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        )
+        logging.info(f"Seeding {content} content rows and {runs} pipeline runs...")
+        seed(pool, content, runs)
+        return check(pool)
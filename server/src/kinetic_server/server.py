@@ -1,4 +1,5 @@
 import argparse
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
@@ -14,10 +15,16 @@ from . import frontend
 def create_server() -> FastAPI:
     container = Container()
 
-    app = FastAPI(title="Kinetic Photo Server")
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        # Calls still running on the I/O pool are left to finish on their own so they don't hold up shutdown.
+        container.io_pool().shutdown()
+
+    app = FastAPI(title="Kinetic Photo Server", lifespan=lifespan)
     app.container = container
     app.container.init_resources()
-    app.container.wire(modules=[__name__, ".endpoints", ".frontend"])
+    app.container.wire(modules=[__name__, ".endpoints", ".frontend", ".steps._apis"])
     app.include_router(endpoints.router)
     frontend.init(app)
 
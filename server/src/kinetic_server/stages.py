@@ -0,0 +1,177 @@
+import contextvars
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Put in a stage's queue to tell one of its workers that there is nothing more to do.
+_DONE = object()
+
+
+class Stage:
+    """A function run by its own pool of threads as one stage of a StagedExecutor."""
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int):
+        """Creates a new stage
+
+        Args:
+            name (str): What to call this stage in the logs.
+            fn (Callable[[Any], Any]): Called with the output of the previous stage. Returning None drops the item.
+            workers (int): How many threads call fn at once.
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+
+
+class StagedExecutor:
+    """Runs items through a chain of stages, like an assembly line.
+
+    Each stage has its own threads and a bounded queue in front of it, so a slow stage (i.e., an ffmpeg render)
+    doesn't stop a faster one (i.e., downloads) from working on the next items, and a full queue makes the stages
+    before it wait rather than read the whole input into memory.
+    """
+
+    QUEUE_SIZE_PER_WORKER = 2
+    DEFAULT_LOG_INTERVAL = 30  # seconds
+
+    def __init__(self, stages: List[Stage], log_interval: Optional[float] = None):
+        """Creates a new executor
+
+        Args:
+            stages (List[Stage]): The stages, in the order items go through them.
+            log_interval (Optional[float]): How often, in seconds, the depth of each queue is logged.
+        """
+        self.stages = stages
+        self.log_interval = log_interval if log_interval else StagedExecutor.DEFAULT_LOG_INTERVAL
+
+    def run(self, items: Iterable[T]) -> Iterator[Tuple[T, Any, Optional[Exception]]]:
+        """Runs the items through the stages. The items are read on a separate thread.
+
+        Args:
+            items (Iterable[T]): The items to process.
+
+        Raises:
+            Exception: Whatever reading the items raised, once the items read before it are done.
+
+        Yields:
+            Tuple[T, Any, Optional[Exception]]: Each item as it finishes, with the output of the last stage it reached
+                (None if a stage dropped it) or the exception a stage raised. Items may finish out of order.
+        """
+        stop = threading.Event()
+        queues = [
+            queue.Queue(maxsize=s.workers * StagedExecutor.QUEUE_SIZE_PER_WORKER)
+            for s in self.stages
+        ]
+        results: queue.Queue = queue.Queue()
+        running = [s.workers for s in self.stages]
+        running_lock = threading.Lock()
+        errors: List[Exception] = []
+
+        def put(q: queue.Queue, entry: Any) -> bool:
+            # Waits for room in the queue, unless the run is stopped.
+            while not stop.is_set():
+                try:
+                    q.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def finish(i: int) -> None:
+            # Everything before stage i is done, so each of its workers is told to exit once its queue is empty.
+            if i == len(self.stages):
+                results.put(_DONE)
+            else:
+                for _ in range(self.stages[i].workers):
+                    put(queues[i], _DONE)
+
+        def feed() -> None:
+            try:
+                for item in items:
+                    if not put(queues[0], (item, item)):
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                finish(0)
+
+        def work(i: int) -> None:
+            stage = self.stages[i]
+            while not stop.is_set():
+                try:
+                    entry = queues[i].get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if entry is _DONE:
+                    break
+                item, value = entry
+                try:
+                    value = stage.fn(value)
+                except Exception as e:
+                    results.put((item, None, e))
+                    continue
+                if value is None:
+                    logging.debug(f"Stage {stage.name} dropped {item}")
+                    results.put((item, None, None))
+                elif i == len(self.stages) - 1:
+                    results.put((item, value, None))
+                else:
+                    put(queues[i + 1], (item, value))
+            with running_lock:
+                running[i] -= 1
+                last = running[i] == 0
+            if last:
+                finish(i + 1)
+
+        # The threads run in copies of the caller's context, so context variables (i.e., the pipeline run being logged)
+        # carry over to them.
+        threads = [
+            threading.Thread(
+                target=contextvars.copy_context().run, args=(feed,), name="stage-feed", daemon=True
+            )
+        ]
+        for i, stage in enumerate(self.stages):
+            threads += [
+                threading.Thread(
+                    target=contextvars.copy_context().run,
+                    args=(work, i),
+                    name=f"stage-{stage.name}-{w}",
+                    daemon=True,
+                )
+                for w in range(stage.workers)
+            ]
+        for t in threads:
+            t.start()
+
+        try:
+            logged_at = time.monotonic()
+            while True:
+                try:
+                    entry = results.get(timeout=self.log_interval)
+                except queue.Empty:
+                    entry = None
+                if time.monotonic() - logged_at >= self.log_interval:
+                    self._log_depths(queues)
+                    logged_at = time.monotonic()
+                if entry is _DONE:
+                    break
+                if entry is not None:
+                    yield entry
+            if errors:
+                raise errors[0]
+        finally:
+            # If the caller stops early, items that haven't started are dropped but running ones are finished.
+            stop.set()
+            for t in threads:
+                t.join()
+
+    def _log_depths(self, queues: List[queue.Queue]) -> None:
+        depths = ", ".join(
+            f"{s.name} {q.qsize()}/{q.maxsize} ({s.workers} workers)"
+            for s, q in zip(self.stages, queues)
+        )
+        logging.info(f"Queued per stage: {depths}")
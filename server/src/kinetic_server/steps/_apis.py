@@ -1,6 +1,9 @@
 """
 If steps require an external resource (database access, etc), use dependency injection to expose them here,
 Don't ibnject them directly into the class constructors as they won't get serialized to the database.
+
+The application's container is wired into this module when it starts (see cli.main and server.create_server),
+so steps share its database connections and object store.
 """
 from dependency_injector.wiring import Provide, inject
 
@@ -30,7 +33,3 @@ def _object_store(os=Provide[Container.object_store]) -> ObjectStore:
 @inject
 def _auxiliary_cache(dc=Provide[Container.auxiliary_cache]) -> AuxiliaryCache:
     return dc
-
-container = Container()
-container.init_resources()
-container.wire(modules=[__name__])
\ No newline at end of file
@@ -1,8 +1,8 @@
 import logging
-import urllib.request
-from typing import Optional, Tuple
+from typing import BinaryIO, Optional, Tuple
 
-from kinetic_server.common import Content, StreamMedia, get_resolution_and_orientation
+from kinetic_server.common import Content, Resolution, StreamMedia, get_resolution_and_orientation
+from kinetic_server.downloads import open_url
 from kinetic_server.steps.step import ContentCreator
 
 class CopyVideo(ContentCreator):
@@ -36,41 +36,49 @@ class CopyVideo(ContentCreator):
         if orientation:
             metadata["orientation"] = orientation.value
 
-        # Download the video if it's a url
+        # Get the video poster
+        poster_bytes = None
+        if "poster_url" in metadata:
+            logging.info(f"Downloading {metadata['poster_url']}....")
+            try:
+                with open_url(metadata["poster_url"]) as response:
+                    poster_bytes = response.read()
+            except Exception as e:
+                logging.warning(
+                    f"Could not download {metadata['poster_url']} for media {m.identifier}..", exc_info=e
+                )
+
+        # Stream the video into the object store (from the url if it's remote, or the existing object if it's an upload)
+        # so that large clips are never held in memory. Pipelines run together share downloads (see DownloadCache).
         if m.url:
             logging.info(f"Downloading {m.url}....")
             try:
-                response = urllib.request.urlopen(m.url)
-                video_bytes = response.read()
+                with open_url(m.url) as response:
+                    return self._create(m, response, resolution, metadata, poster_bytes)
             except Exception as e:
                 logging.warning(
                     f"Could not download {m.url} for media {m.identifier}..", exc_info=e
                 )
                 return None
-        # Load the video if it's an upload
         elif os.exists(m.identifier):
-            video_bytes = os.get(m.identifier)
+            with os.open(m.identifier) as fin:
+                return self._create(m, fin, resolution, metadata, poster_bytes)
         else:
             logging.info(
                 f"Could not download or find a video file for {m.identifier} .."
             )
             return None
-        
-        # Get the video poster
-        poster_bytes = None
-        if "poster_url" in metadata:
-            logging.info(f"Downloading {metadata['poster_url']}....")
-            try:
-                response = urllib.request.urlopen(metadata["poster_url"])
-                poster_bytes = response.read()
-            except Exception as e:
-                logging.warning(
-                    f"Could not download {metadata['poster_url']} for media {m.identifier}..", exc_info=e
-                )
-        
-        # Create the content
+
+    def _create(
+        self,
+        m: StreamMedia,
+        video_file: BinaryIO,
+        resolution: Optional[Resolution],
+        metadata: dict,
+        poster_bytes: Optional[bytes],
+    ) -> Content:
         return self.content_api.create(
-            video_file=video_bytes,
+            video_file=video_file,
             resolution=resolution,
             created_at=m.created_at,
             source_id=m.identifier,
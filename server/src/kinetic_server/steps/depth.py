@@ -75,10 +75,8 @@ class ComputeDepth(Step):
                 )
 
                 if len(result) > 1 and result[1] == "Completed":
-                    with open(result[0], "rb") as fin:
-                        depth_bytes = fin.read()
-                    depth_image = auxiliary_cache.save(
-                        media.identifier, DEPTH_TYPE, depth_bytes
+                    depth_image = auxiliary_cache.save_file(
+                        media.identifier, DEPTH_TYPE, result[0]
                     )
                     os.remove(result[0])
                 else:
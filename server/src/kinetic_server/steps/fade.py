@@ -3,7 +3,7 @@ import json
 import subprocess
 from tempfile import NamedTemporaryFile
 from typing import Optional, Tuple
-from kinetic_server.common import Content, ContentVersion, Resolution
+from kinetic_server.common import Content, ContentVersion, Resolution, VideoInfo
 
 from kinetic_server.steps.step import ContentAugmentor
 
@@ -71,60 +71,68 @@ def get_video_duration(filename: str) -> float:
 
 
 def fade_video(
-    video_bytes: bytes,
+    input_filename: str,
+    output_filename: str,
     fade_duration: float = 1,
     video_bitrate: int = 1200,
-    resolution: Optional[Resolution] = None
-) -> Tuple[bytes, float]:
+    resolution: Optional[Resolution] = None,
+    video_info: Optional[VideoInfo] = None
+) -> float:
     """Adds a black fading effect to the beginning and ending of a video.
 
     Args:
-        video_bytes (bytes): The video to alter
+        input_filename (str): The video to alter
+        output_filename (str): Where to write the re-rendered video
         fade_duration (float, optional): The number of seconds the fade shold be. Defaults to 1.
         video_bitrate (int, optional): The video bitrate (in k) for the re-encoded video. Defaults to 1200.
         resolution (Resolution, optional): Scale the video to the provided resolution
+        video_info (VideoInfo, optional): The video's stored info. If it has the frame rate and frame count, the frames
+            aren't counted.
 
     Returns:
-        Tuple[bytes, float]: The bytes of the re-rendered video, and the video duration.
+        float: The video duration.
     """
-    with NamedTemporaryFile() as tmpfile:
-        with open(tmpfile.name, "wb") as fout:
-            fout.write(video_bytes)
-        time_info = get_video_time_data(tmpfile.name)
+    if video_info and video_info.fps and video_info.frames:
+        fps = video_info.fps
+        total_frames = video_info.frames
+        video_duration = video_info.duration if video_info.duration else total_frames / fps
+    else:
+        # Counting frames decodes the whole video, so this is only done for content whose frame count isn't known.
+        # The container's duration times the frame rate isn't used instead: it's wrong for variable frame rate
+        # clips and clips whose audio is longer than the video, so the fade out would start at the wrong frame.
+        time_info = get_video_time_data(input_filename)
         fps = eval(time_info['streams'][0]['r_frame_rate'])
-        frames_to_fade = int(fade_duration * fps)
         total_frames = int(time_info['streams'][0]['nb_read_frames'])
         video_duration = float(time_info['format']['duration'])
-        with NamedTemporaryFile(suffix=".mp4") as resultfile:
-
-            filter = f"fade=t=in:s=0:n={frames_to_fade},fade=t=out:s={total_frames - frames_to_fade}:n={frames_to_fade}"
-            if resolution:
-                filter += f",scale={resolution.width}:{resolution.height}"
-
-            cmd = [
-                "ffmpeg",
-                "-i",
-                tmpfile.name,
-                "-loglevel",
-                "error",
-                "-hide_banner",
-                "-vf",
-                filter,
-                "-b:v",
-                f"{video_bitrate}k",
-                "-c:a",
-                "copy",
-                "-f",
-                "mp4",
-                "-movflags",
-                "+faststart",
-                "-y",
-                resultfile.name,
-            ]
-            logging.info(f"Fading video with command:" + " ".join(cmd))
-            subprocess.run(cmd, check=True)
-            with open(resultfile.name, "rb") as fin:
-                return (fin.read(), video_duration)
+    frames_to_fade = int(fade_duration * fps)
+
+    filter = f"fade=t=in:s=0:n={frames_to_fade},fade=t=out:s={total_frames - frames_to_fade}:n={frames_to_fade}"
+    if resolution:
+        filter += f",scale={resolution.width}:{resolution.height}"
+
+    cmd = [
+        "ffmpeg",
+        "-i",
+        input_filename,
+        "-loglevel",
+        "error",
+        "-hide_banner",
+        "-vf",
+        filter,
+        "-b:v",
+        f"{video_bitrate}k",
+        "-c:a",
+        "copy",
+        "-f",
+        "mp4",
+        "-movflags",
+        "+faststart",
+        "-y",
+        output_filename,
+    ]
+    logging.info(f"Fading video with command:" + " ".join(cmd))
+    subprocess.run(cmd, check=True)
+    return video_duration
 
 
 class Fade(ContentAugmentor):
@@ -183,14 +191,21 @@ class Fade(ContentAugmentor):
                     logging.warning(f"Rescaling media {c.id} from {c.resolution.to_dict()} to {target_resolution.to_dict()}")
                 else:
                     logging.info(f"Keeping original resolution for {c.id} of {c.resolution.to_dict()}")
-                faded_bytes, video_duration = fade_video(
-                    os.get(c.id),
-                    video_bitrate=self.video_bitrate,
-                    fade_duration=self.fade_duration,
-                    resolution=target_resolution
-                )
-                c.versions[ContentVersion.Faded] = os.add(faded_bytes)
+                # ffmpeg reads the original straight from the object store and the result is streamed back in,
+                # so neither video is loaded into memory.
+                with NamedTemporaryFile(suffix=".mp4") as resultfile:
+                    video_duration = fade_video(
+                        os.path(c.id),
+                        resultfile.name,
+                        video_bitrate=self.video_bitrate,
+                        fade_duration=self.fade_duration,
+                        resolution=target_resolution,
+                        video_info=c.video_info
+                    )
+                    c.versions[ContentVersion.Faded] = os.add_file(resultfile.name)
                 c.metadata['duration'] = video_duration
+                if c.video_info is None:
+                    c.video_info = VideoInfo(duration=video_duration)
             except Exception as e:
                 logging.warning(f"Could not create faded video for {c.id}", exc_info=e)
                 return c
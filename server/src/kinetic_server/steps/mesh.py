@@ -68,7 +68,7 @@ class ComputeMesh(Step):
             )
             if "depth_map" not in media.metadata:
                 raise Exception(f"Media {media.identifier} has no depth map...")
-            depth_image_path = auxiliary_cache.os._hash_path(media.metadata["depth_map"])
+            depth_image_path = auxiliary_cache.os.path(media.metadata["depth_map"])
             start_t = datetime.now()
             client = get_client(src=self.hf_src, hf_token=self.hf_token)
             result = client.predict(
@@ -79,9 +79,7 @@ class ComputeMesh(Step):
                 f"Computing the mesh for {media.identifier} took {str(end_t-start_t)}, result: {result}"
             )
 
-            with open(result, "rb") as fin:
-                mesh_bytes = fin.read()
-            mesh = auxiliary_cache.save(media.identifier, MESH_TYPE, mesh_bytes)
+            mesh = auxiliary_cache.save_file(media.identifier, MESH_TYPE, result)
             os.remove(result)
 
         media.metadata["mesh"] = mesh.file_hash
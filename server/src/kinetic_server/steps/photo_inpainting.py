@@ -59,8 +59,8 @@ class PhotoInpainting(Step):
             )
 
         client = get_client(warmup=True, src=self.hf_src, hf_token=self.hf_token)
-        depth_image_path = os._hash_path(media.metadata["depth_map"])
-        mesh_path = os._hash_path(media.metadata["mesh"])
+        depth_image_path = os.path(media.metadata["depth_map"])
+        mesh_path = os.path(media.metadata["mesh"])
 
         logging.info(
             f"Rendering video for {media.identifier} using {self.hf_src}, this may take a while...."
@@ -83,13 +83,13 @@ class PhotoInpainting(Step):
 
         # Create the new content
         with open(result, "rb") as fin:
-            video_bytes = fin.read()
+            content = content_api.create(
+                video_file=fin,
+                resolution=resolution,
+                created_at=media.created_at,
+                source_id=media.identifier,
+                stream_id=media.stream_id,
+                metadata=metadata,
+            )
         os.remove(result)
-        return content_api.create(
-            video_file=video_bytes,
-            resolution=resolution,
-            created_at=media.created_at,
-            source_id=media.identifier,
-            stream_id=media.stream_id,
-            metadata=metadata,
-        )
+        return content
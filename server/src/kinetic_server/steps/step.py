@@ -17,7 +17,9 @@ class Step:
             str: A json encoded dictionary containing this steps classname and parameters.
         """
 
-        return json.dumps({"type": self.__class__.__name__, "params": self.__dict__})
+        # Attributes starting with an underscore hold state for a single run and aren't parameters.
+        params = {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+        return json.dumps({"type": self.__class__.__name__, "params": params})
 
     def __str__(self) -> str:
         return self.__rep__()
@@ -39,6 +41,20 @@ class Step:
         """
         ...
 
+    def on_run_start(self) -> None:
+        """Called by the pipeline before it processes any media, so steps can load what they need for the run.
+        Any state kept should be stored in attributes starting with an underscore so it isn't serialized.
+        """
+        pass
+
+    def on_content_saved(self, c: Content) -> None:
+        """Called by the pipeline after it saves content.
+
+        Args:
+            c (Content): The content that was saved.
+        """
+        pass
+
     @property
     def name(self) -> str:
         """Returns the step name. This may change if we have hot-loadable steps or steps with different arguments.
@@ -1,8 +1,9 @@
 import copy
-import sys
-from datetime import datetime
+import queue
+import threading
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from gphotospy.media import *
 from jsonpath_ng.ext import parse
@@ -31,6 +32,35 @@ class Stream:
     def __next__(self):
         ...
 
+    def checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Returns the stream's position just after the last media it returned, for `resume`.
+
+        Returns:
+            Optional[Dict[str, Any]]: A json serializable position, or None if this stream can't be resumed.
+        """
+        return None
+
+    def resume(self, checkpoint: Dict[str, Any]) -> None:
+        """Makes the stream continue from a position returned by `checkpoint`. Call this before iterating.
+
+        Args:
+            checkpoint (Dict[str, Any]): The position to continue from.
+        """
+        raise Exception(f"{type(self).__name__} streams can't be resumed.")
+
+    def since(self, created_after: datetime) -> None:
+        """Makes the stream only return media created after this time. Call this before iterating.
+
+        Args:
+            created_after (datetime): Skip media created at or before this time. Times without a timezone are utc.
+        """
+        raise Exception(f"{type(self).__name__} streams can't skip older media.")
+
+
+def _utc(t: datetime) -> datetime:
+    # Media times are compared without a timezone, in utc, as they're stored in the database.
+    return t.astimezone(timezone.utc).replace(tzinfo=None) if t.tzinfo is not None else t
+
 class StreamsApi:
     def __init__(
         self, db: StreamsDb, integrations_api: IntegrationsApi, uploads_api: UploadsApi
@@ -85,10 +115,85 @@ class StreamsApi:
                 return UploadsStream(id, self._uploads_api, **params)
 
 
+def _search_filters(filters: list, exclude: Optional[list]) -> Dict[str, Any]:
+    """Builds the `filters` of a google photos mediaItems.search request from gphotospy filters, as Media.search does."""
+
+    def values(fs: Optional[list], type: str) -> list:
+        return [f.val for f in fs or [] if f.isinstance(type)]
+
+    search_filters = {"includeArchivedMedia": False, "excludeNonAppCreatedData": False}
+    for name, filter in [
+        ("dateFilter", {"dates": values(filters, "DATE"), "ranges": values(filters, "DATERANGE")}),
+        (
+            "contentFilter",
+            {
+                "includedContentCategories": values(filters, "CONTENTFILTER"),
+                "excludedContentCategories": values(exclude, "CONTENTFILTER"),
+            },
+        ),
+        ("mediaTypeFilter", {"mediaTypes": values(filters, "MEDIAFILTER")}),
+        ("featureFilter", {"includedFeatures": values(filters, "FEATUREFILTER")}),
+    ]:
+        filter = {k: v for k, v in filter.items() if v}
+        if filter:
+            search_filters[name] = filter
+    return search_filters
+
+
 class GooglePhotosStream(Stream):
+    # Whether google returns this stream's media newest first, so reading can stop at the first media that's too old.
+    NEWEST_FIRST = False
+    # How many media are requested at a time (the api's maximum). Checkpoints hold page tokens for pages of this size.
+    PAGE_SIZE = 100
+
     def __init__(self, id: int, integration: Integration):
         super().__init__(id)
         self.integration = integration
+        self._resume_from: Optional[Dict[str, Any]] = None
+        self._page_token: Optional[str] = None  # The page being read ("" is the first page)
+        self._index = 0  # How many media of the page have been read
+        self._skip = 0
+        self.created_after: Optional[datetime] = None
+
+    def _search(self, gp, body: Dict[str, Any]) -> Iterator[dict]:
+        """Pages through a mediaItems.search, starting from the page this stream was resumed from.
+        gphotospy's searches don't expose page tokens, so the api is called directly.
+
+        Args:
+            gp: The google photos service object returned by the integration.
+            body (Dict[str, Any]): The search request, without its page size or token.
+
+        Returns:
+            Iterator[dict]: Each media item found.
+        """
+        # The media of the resumed page that were already read are skipped (see __next__).
+        self._skip = self._resume_from["index"] if self._resume_from else 0
+        return self._pages(
+            gp["service"], body, self._resume_from["page_token"] if self._resume_from else ""
+        )
+
+    def _pages(self, service, body: Dict[str, Any], page_token: str) -> Iterator[dict]:
+        while page_token is not None:
+            self._page_token = page_token
+            self._index = 0
+            result = (
+                service.mediaItems()
+                .search(body={**body, "pageSize": self.PAGE_SIZE, "pageToken": page_token})
+                .execute()
+            )
+            page_token = result.get("nextPageToken", None)
+            yield from result.get("mediaItems", [])
+
+    def checkpoint(self) -> Optional[Dict[str, Any]]:
+        if self._page_token is None:
+            return None
+        return {"page_token": self._page_token, "index": self._index}
+
+    def resume(self, checkpoint: Dict[str, Any]) -> None:
+        self._resume_from = checkpoint
+
+    def since(self, created_after: datetime) -> None:
+        self.created_after = _utc(created_after)
 
     def __to_media__(self, m: MediaItem) -> StreamMedia:
         # Metadata commonly returned from google has width, height, photo info (camera make, model, etc)
@@ -125,7 +230,18 @@ class GooglePhotosStream(Stream):
         )
 
     def __next__(self):
-        return self.__to_media__(MediaItem(next(self.iterator)))
+        # Media of the resumed page that were already read are skipped.
+        while self._skip:
+            next(self.iterator)
+            self._index += 1
+            self._skip -= 1
+        while True:
+            media = self.__to_media__(MediaItem(next(self.iterator)))
+            self._index += 1
+            if not self.created_after or _utc(media.created_at) > self.created_after:
+                return media
+            if self.NEWEST_FIRST:
+                raise StopIteration
 
 
 class GooglePhotosAlbumStream(GooglePhotosStream):
@@ -135,11 +251,13 @@ class GooglePhotosAlbumStream(GooglePhotosStream):
 
     def __iter__(self):
         with self.integration as gp:
-            self.iterator = Media(gp).search_album(self.album_id)
+            self.iterator = self._search(gp, {"albumId": self.album_id})
         return self
 
 
 class GooglePhotosSearchStream(GooglePhotosStream):
+    NEWEST_FIRST = True
+
     def __init__(
         self,
         id: int,
@@ -164,23 +282,61 @@ class GooglePhotosSearchStream(GooglePhotosStream):
         self.filter = filter
         self.exclude = exclude
 
+    def _filters(self) -> list:
+        filters = list(self.filter) if isinstance(self.filter, list) else [self.filter] if self.filter else []
+        # Google only returns media from the days after created_after, unless the search already filters by date
+        # (the date filters would be or'd together). Days are in the media's local time, so one more is included.
+        has_dates = any(f.isinstance("DATE") or f.isinstance("DATERANGE") for f in filters)
+        if self.created_after and not has_dates:
+            start = self.created_after - timedelta(days=1)
+            filters.append(date_range(date(start.year, start.month, start.day), date(9999, 12, 31)))
+        return filters
+
     def __iter__(self):
         with self.integration as gp:
-            self.iterator = Media(gp).search(self.filter, self.exclude)
+            exclude = self.exclude if isinstance(self.exclude, list) or self.exclude is None else [self.exclude]
+            self.iterator = self._search(gp, {"filters": _search_filters(self._filters(), exclude)})
         return self
 
 
 class UploadsStream(Stream):
-    """A stream of uploaded media."""
+    """A stream of uploaded media, newest first."""
+
+    PAGE_SIZE = 500
 
     def __init__(self, id: int, uploads: UploadsApi):
         self.id = id
         self.api = uploads
+        # The (created_at, id) of the last upload returned.
+        self._after: Optional[Tuple[datetime, str]] = None
+        self.created_after: Optional[datetime] = None
 
     def __iter__(self):
-        self.iterator = self.api.query(limit=sys.maxsize)
+        self.iterator = self._pages(self._after)
         return self
 
+    def _pages(self, after: Optional[Tuple[datetime, str]]) -> Iterator[Upload]:
+        # Uploads are read a page at a time rather than all at once.
+        while True:
+            page = self.api.query(
+                limit=UploadsStream.PAGE_SIZE, after=after, created_after=self.created_after
+            )
+            yield from page
+            if len(page) < UploadsStream.PAGE_SIZE:
+                return
+            after = (page[-1].created_at, page[-1].id)
+
+    def checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not self._after:
+            return None
+        return {"created_at": self._after[0].isoformat(), "id": self._after[1]}
+
+    def resume(self, checkpoint: Dict[str, Any]) -> None:
+        self._after = (datetime.fromisoformat(checkpoint["created_at"]), checkpoint["id"])
+
+    def since(self, created_after: datetime) -> None:
+        self.created_after = _utc(created_after)
+
     def __to_media__(self, upload: Upload) -> StreamMedia:
         return StreamMedia(
             created_at=upload.created_at,
@@ -192,4 +348,98 @@ class UploadsStream(Stream):
         )
 
     def __next__(self):
-        return self.__to_media__(next(self.iterator))
+        upload = next(self.iterator)
+        self._after = (upload.created_at, upload.id)
+        return self.__to_media__(upload)
+
+
+# Put in a stream copy's queue once the stream has been read.
+_END = object()
+
+
+class _StreamCopy(Stream):
+    """One consumer's copy of a stream read by a StreamFanOut."""
+
+    def __init__(self, id: int):
+        super().__init__(id)
+        self.queue: queue.Queue = queue.Queue(maxsize=StreamFanOut.QUEUE_SIZE)
+        self.closed = threading.Event()
+        self.created_after: Optional[datetime] = None
+        self._ended = False
+
+    def since(self, created_after: datetime) -> None:
+        # The stream is shared, so older media are skipped here rather than by the source.
+        self.created_after = _utc(created_after)
+
+    def close(self) -> None:
+        """Stops the fan out from sending any more media to this copy (i.e., when its consumer stops early)."""
+        self.closed.set()
+
+    def __next__(self):
+        while not self._ended:
+            entry = self.queue.get()
+            if entry is _END:
+                self._ended = True
+            elif isinstance(entry, Exception):
+                self._ended = True
+                raise entry
+            elif not self.created_after or _utc(entry.created_at) > self.created_after:
+                return entry
+        raise StopIteration
+
+
+class StreamFanOut:
+    """Reads a stream once on behalf of several consumers, each of which gets its own copy of every media.
+
+    Use as a context manager, which starts reading the stream and returns the copies. Each copy only holds a few
+    media, so the slowest consumer sets the pace and the others stay close enough to it to share downloads.
+    """
+
+    QUEUE_SIZE = 8
+
+    def __init__(self, stream: Stream, consumers: int):
+        """Creates a new fan out
+
+        Args:
+            stream (Stream): The stream to read.
+            consumers (int): How many copies of the stream to make.
+        """
+        self.stream = stream
+        self.copies = [_StreamCopy(stream.id) for _ in range(consumers)]
+        self._thread = threading.Thread(
+            target=self._read, name=f"stream-{stream.id}-fan-out", daemon=True
+        )
+
+    def __enter__(self) -> List[Stream]:
+        self._thread.start()
+        return self.copies
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        for c in self.copies:
+            c.close()
+        self._thread.join()
+
+    def _put(self, c: _StreamCopy, entry: Any) -> None:
+        # Waits for room in the copy's queue, unless the copy is closed.
+        while not c.closed.is_set():
+            try:
+                c.queue.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _read(self) -> None:
+        end = _END
+        try:
+            for media in self.stream:
+                open_copies = [c for c in self.copies if not c.closed.is_set()]
+                if not open_copies:
+                    return
+                # Steps change the media they're given, so each consumer gets its own copy.
+                for c in open_copies:
+                    self._put(c, copy.deepcopy(media))
+        except Exception as e:
+            logging.error(f"Could not read stream {self.stream.id}.", exc_info=e)
+            end = e
+        for c in self.copies:
+            self._put(c, end)
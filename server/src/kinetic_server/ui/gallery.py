@@ -19,6 +19,7 @@ class GalleryQuery:
     source_id: Optional[str] = None
     stream_id: Optional[int] = None
     pipeline_id: Optional[int] = None
+    search: Optional[str] = None  # words to look for in the metadata, i.e. a filename or camera model
 
 
 def _next_page(
@@ -123,6 +124,25 @@ class GalleryUI:
     
     def render(self, initial_query: GalleryQuery = GalleryQuery(), column_width=248):
 
+        def search(e):
+            nonlocal state, has_next
+            state = GalleryQuery(
+                **{
+                    **initial_query.to_dict(),
+                    "created_before": datetime.now().isoformat(),
+                    "search": e.value if e.value else None,
+                }
+            )
+            has_next = True
+            grid.clear()
+            load_more()
+
+        ui.input(
+            placeholder="Search filenames, cameras, albums...",
+            value=initial_query.search,
+            on_change=search,
+        ).props("clearable dense debounce=300").classes("w-full q-px-md")
+
         grid = _masory_grid(column_width)
         has_next = True
         state = initial_query
@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime
 from io import BytesIO
-from typing import List
+from typing import BinaryIO, List
 
 import magic
 import pandas as pd
@@ -13,17 +13,17 @@ from .common import Upload
 from .db import UploadsDb
 
 
-def get_exif_data(bytes: bytes) -> dict:
+def get_exif_data(file: BinaryIO) -> dict:
     """Extracts the exif data from the provided image and returns it as a dictionary.
 
     Args:
-        bytes (bytes): The compressed jpeg image loaded into ram.
+        file (BinaryIO): The compressed jpeg image. Only the image headers are read.
 
     Returns:
         dict: A dictionary of exif tag -> value
     """
     try:
-        img = Image.open(BytesIO(bytes))
+        img = Image.open(file)
         exif_data = img.getexif()
         exif_data = {
             ExifTags.TAGS[k]: v for k, v in exif_data.items() if k in ExifTags.TAGS
@@ -54,17 +54,54 @@ class UploadsApi:
         Returns:
             Upload: An object with the information about this file.
         """
-        content_type = magic.from_buffer(file, mime=True)
+        return self.add_stream(BytesIO(file))
+
+    def add_stream(self, file: BinaryIO) -> Upload:
+        """Ingests the provided file into the uploads data store without loading it into memory.
+
+        Args:
+            file (BinaryIO): A seekable file opened in binary mode.
+
+        Returns:
+            Upload: An object with the information about this file.
+        """
+        u = self._store(file)
+        self.db.save(u)
+        return u
+
+    def add_files(self, filenames: List[str]) -> List[Upload]:
+        """Ingests files from disk. The uploads are saved to the database in batches.
+
+        Args:
+            filenames (List[str]): The files to add.
+
+        Returns:
+            List[Upload]: The information about each file.
+        """
+        uploads = []
+        with self.db.batch() as batch:
+            for filename in filenames:
+                with open(filename, "rb") as fin:
+                    u = self._store(fin)
+                batch.save(u)
+                uploads.append(u)
+        return uploads
+
+    def _store(self, file: BinaryIO) -> Upload:
+        # Adds the file to the object store and describes it, without saving it to the database.
+        content_type = magic.from_buffer(file.read(2048), mime=True)
+        file.seek(0)
         metadata = {}
         if content_type.startswith("image"):
             metadata.update(get_exif_data(file))
+            file.seek(0)
 
         if "DateTime" in metadata:
             created_at = datetime.strptime(metadata["DateTime"], "%Y:%m:%d %H:%M:%S")
         else:
             created_at = datetime.now()
 
-        hash = self.objectstore.add(file)
+        hash = self.objectstore.add_stream(file)
 
         logging.info(f"Metadata is {type(metadata)}: " + str(metadata))
 
@@ -75,7 +112,6 @@ class UploadsApi:
             content_type=content_type,
             metadata=metadata,
         )
-        self.db.save(u)
         return u
 
     def remove(self, id: str) -> None: